@@ -99,12 +99,10 @@ def main(args) -> None:
 
         if 'JPEGThumbnail' in data:
             logger.info('File has JPEG thumbnail')
-            del data['JPEGThumbnail']
         if 'TIFFThumbnail' in data:
             logger.info('File has TIFF thumbnail')
-            del data['TIFFThumbnail']
 
-        tag_keys = list(data.keys())
+        tag_keys = [key for key in data.keys() if key not in ('JPEGThumbnail', 'TIFFThumbnail')]
         tag_keys.sort()
 
         for i in tag_keys:
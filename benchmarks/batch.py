@@ -0,0 +1,76 @@
+"""
+Throughput of ``process_files()`` against the serial loop of ``EXIF.py``.
+
+Writes synthetic TIFF files to a temporary directory and processes them
+one after the other with ``process_file()``, then on thread pools of
+increasing size. A latency can be added to the opening of every file, to
+stand for network storage.
+
+Run from the repository root with::
+
+    python -m benchmarks.batch --latency 5
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import timeit
+
+import exifread
+from exifread import batch
+
+from benchmarks.decode import build_tiff
+
+
+def slow_open(latency: float):
+    """Return an ``open()`` taking ``latency`` seconds more."""
+    def _open(path, mode='r'):
+        time.sleep(latency)
+        return open(path, mode)
+    return _open
+
+
+def serial(paths: list, opener) -> None:
+    """Process the files one after the other, as EXIF.py does."""
+    for path in paths:
+        with opener(path, 'rb') as img_file:
+            exifread.process_file(img_file, details=False)
+
+
+def pooled(paths: list, workers: int) -> None:
+    for _ in exifread.process_files(paths, workers=workers, details=False):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Time process_files() against a serial loop.')
+    parser.add_argument('-f', '--files', type=int, default=500, help='number of files')
+    parser.add_argument('-n', '--tags', type=int, default=60, help='number of tags per file')
+    parser.add_argument('-l', '--latency', type=float, default=0, help='added latency per file, in ms')
+    parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 4, 16, 32],
+                        help='thread pool sizes')
+    args = parser.parse_args()
+
+    opener = slow_open(args.latency / 1000) if args.latency else open
+    # the pool workers open the files through the batch module
+    batch.open = opener
+
+    tiff = build_tiff(args.tags)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, '%05d.tif' % i)
+            with open(path, 'wb') as fh:
+                fh.write(tiff)
+            paths.append(path)
+
+        elapsed = timeit.timeit(lambda: serial(paths, opener), number=1)
+        print('%-12s %8.0f files/s' % ('serial', args.files / elapsed))
+        for workers in args.workers:
+            elapsed = timeit.timeit(lambda: pooled(paths, workers), number=1)
+            print('%-12s %8.0f files/s' % ('%d threads' % workers, args.files / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of the IFD decoding cost per tag.
+
+Builds a synthetic TIFF holding one IFD of mixed entries and times
+``ExifHeader.dump_ifd()`` and ``ExifHeader.index()`` on it, as well as single
+``ExifHeader.s2n()`` conversions, reading through the file handle and from an
+in-memory buffer.
+
+Run from the repository root with::
+
+    python -m benchmarks.decode
+"""
+
+import io
+import struct
+import argparse
+import timeit
+
+from exifread import classes
+from exifread.classes import ExifHeader
+
+# (field type, count, packed value) of the entries, repeated to fill the IFD
+ENTRIES = (
+    (3, 1, struct.pack('<H', 6)),
+    (4, 1, struct.pack('<I', 1024)),
+    (5, 1, struct.pack('<II', 1, 250)),
+    (10, 1, struct.pack('<ii', -1, 3)),
+    (3, 4, struct.pack('<4H', 1, 2, 3, 4)),
+    (2, 20, b'2020:01:02 03:04:05\x00'),
+    (3, 256, struct.pack('<256H', *range(256))),
+    (12, 1, struct.pack('<d', 1.5)),
+)
+
+
+def build_tiff(num_tags: int) -> bytes:
+    """Return a little-endian TIFF with ``num_tags`` entries in IFD0."""
+    ifd_size = 2 + 12 * num_tags + 4
+    data_offset = 8 + ifd_size
+    entries = b''
+    data = b''
+    for i in range(num_tags):
+        field_type, count, value = ENTRIES[i % len(ENTRIES)]
+        tag = 0xC000 + i
+        if len(value) <= 4:
+            entries += struct.pack('<HHI', tag, field_type, count) + value.ljust(4, b'\x00')
+        else:
+            entries += struct.pack('<HHII', tag, field_type, count, data_offset + len(data))
+            data += value
+    return b'II*\x00' + struct.pack('<I', 8) + struct.pack('<H', num_tags) + entries + b'\x00' * 4 + data
+
+
+def make_header(tiff: bytes, buffered: bool) -> ExifHeader:
+    return ExifHeader(io.BytesIO(tiff), 'I', 0, 0, False, truncate_tags=False,
+                      data=tiff if buffered else None)
+
+
+def time_per_tag(tiff: bytes, num_tags: int, buffered: bool, number: int) -> float:
+    """Return the mean decoding time of one tag, in microseconds."""
+    def run():
+        make_header(tiff, buffered).dump_ifd(8, 'Image')
+
+    return min(timeit.repeat(run, number=number, repeat=5)) / number / num_tags * 1e6
+
+
+def time_per_indexed_tag(tiff: bytes, num_tags: int, buffered: bool, number: int) -> float:
+    """Return the mean indexing time of one tag, in microseconds."""
+    def run():
+        make_header(tiff, buffered).index()
+
+    return min(timeit.repeat(run, number=number, repeat=5)) / number / num_tags * 1e6
+
+
+def time_per_s2n(tiff: bytes, buffered: bool, number: int) -> float:
+    """Return the mean time of one integer conversion, in nanoseconds."""
+    hdr = make_header(tiff, buffered)
+    return min(timeit.repeat(lambda: hdr.s2n(10, 2), number=number, repeat=5)) / number * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Time the IFD decoding cost per tag.')
+    parser.add_argument('-n', '--tags', type=int, default=400, help='number of tags in the IFD')
+    parser.add_argument('-r', '--runs', type=int, default=50, help='number of runs per timing')
+    parser.add_argument('--no-numpy', action='store_true', help='decode the IFD entry by entry')
+    args = parser.parse_args()
+    if args.no_numpy:
+        classes.NUMPY_MIN_ENTRIES = float('inf')
+
+    tiff = build_tiff(args.tags)
+    for buffered in (False, True):
+        print('%-12s %6.2f us/tag %6.2f us/indexed tag %6.0f ns/s2n' % (
+            'buffered' if buffered else 'file handle',
+            time_per_tag(tiff, args.tags, buffered, args.runs),
+            time_per_indexed_tag(tiff, args.tags, buffered, args.runs),
+            time_per_s2n(tiff, buffered, args.runs * 1000),
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark of the ``import exifread`` cold-start time.
+
+Runs ``python -X importtime -c "import exifread"`` in fresh interpreters and
+reports the best cumulative import time of the package and of its heaviest
+modules. Fails when a module meant to be imported on first use only (format
+locators, XMP backend, makernote tables) is imported with the package.
+
+Run from the repository root with::
+
+    python -m benchmarks.importtime
+"""
+
+import argparse
+import subprocess
+import sys
+
+# imported on first use only, must not be loaded by "import exifread"
+LAZY_MODULES = (
+    'exifread.heic',
+    'exifread.ifd_numpy',
+    'exifread.jpeg',
+    'exifread.xmp',
+    'exifread.xmp_rdflib',
+    'exifread.tags.makernote.apple',
+    'exifread.tags.makernote.canon',
+    'exifread.tags.makernote.casio',
+    'exifread.tags.makernote.flir',
+    'exifread.tags.makernote.fujifilm',
+    'exifread.tags.makernote.nikon',
+    'exifread.tags.makernote.olympus',
+    'numpy',
+    'rdflib',
+    'xml.etree.ElementTree',
+)
+
+
+def import_times(module: str) -> dict:
+    """Return the cumulative import time of every module loaded, in microseconds."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+        stderr=subprocess.PIPE, check=True, universal_newlines=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Time the import of exifread.')
+    parser.add_argument('-r', '--runs', type=int, default=10, help='number of interpreters started')
+    parser.add_argument('-m', '--module', default='exifread', help='module to import')
+    parser.add_argument('-t', '--top', type=int, default=8, help='number of modules listed')
+    args = parser.parse_args()
+
+    best = {}  # type: dict
+    for _ in range(args.runs):
+        for name, cumulative in import_times(args.module).items():
+            best[name] = min(cumulative, best.get(name, cumulative))
+
+    print('%-40s %8.2f ms' % (args.module, best[args.module] / 1000))
+    own = sorted((name for name in best if name.startswith('exifread.')), key=best.get, reverse=True)
+    for name in own[:args.top]:
+        print('  %-38s %8.2f ms' % (name, best[name] / 1000))
+
+    loaded = [name for name in LAZY_MODULES if name in best]
+    if loaded:
+        print('imported eagerly: %s' % ', '.join(loaded))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Throughput of ``scan()`` against ``process_files()`` on a CPU-bound workload.
+
+Writes a tree of synthetic JPEG files holding Exif and XMP data to a
+temporary directory and processes it with all details and XMP parsing,
+on thread pools and on process pools of the same sizes.
+
+Run from the repository root with::
+
+    python -m benchmarks.scan
+"""
+
+import argparse
+import os
+import struct
+import tempfile
+import timeit
+
+import exifread
+from exifread.scanner import walk
+
+from benchmarks.decode import build_tiff
+
+XMP = (
+    b'<x:xmpmeta xmlns:x="adobe:ns:meta/">'
+    b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+    b'<rdf:Description rdf:about="" xmlns:xmp="http://ns.adobe.com/xap/1.0/"'
+    b' xmlns:dc="http://purl.org/dc/elements/1.1/" xmp:Rating="3" xmp:CreatorTool="bench">'
+    b'<dc:subject><rdf:Bag><rdf:li>a</rdf:li><rdf:li>b</rdf:li><rdf:li>c</rdf:li></rdf:Bag></dc:subject>'
+    b'<dc:title><rdf:Alt><rdf:li xml:lang="x-default">title</rdf:li></rdf:Alt></dc:title>'
+    b'</rdf:Description></rdf:RDF></x:xmpmeta>'
+)
+
+
+def segment(marker: bytes, payload: bytes) -> bytes:
+    return marker + struct.pack('>H', len(payload) + 2) + payload
+
+
+def build_jpeg(num_tags: int) -> bytes:
+    """Return a JPEG file (without image data) holding Exif and XMP segments."""
+    return (b'\xFF\xD8'
+            + segment(b'\xFF\xE1', b'Exif\x00\x00' + build_tiff(num_tags))
+            + segment(b'\xFF\xE1', b'http://ns.adobe.com/xap/1.0/\x00' + XMP)
+            + b'\xFF\xD9')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Time scan() against process_files().')
+    parser.add_argument('-f', '--files', type=int, default=2000, help='number of files')
+    parser.add_argument('-n', '--tags', type=int, default=60, help='number of tags per file')
+    parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4],
+                        help='pool sizes')
+    args = parser.parse_args()
+
+    jpeg = build_jpeg(args.tags)
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.files):
+            folder = os.path.join(tmp, '%03d' % (i // 100))
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, '%05d.jpg' % i), 'wb') as fh:
+                fh.write(jpeg)
+
+        for workers in args.workers:
+            elapsed = timeit.timeit(
+                lambda: list(exifread.process_files(walk(tmp), workers=workers, xmp=True)), number=1)
+            print('%-12s %8.0f files/s' % ('%d threads' % workers, args.files / elapsed))
+        for workers in args.workers:
+            elapsed = timeit.timeit(lambda: list(exifread.scan(tmp, processes=workers, xmp=True)), number=1)
+            print('%-12s %8.0f files/s' % ('%d processes' % workers, args.files / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,22 +2,57 @@
 Read Exif metadata from tiff and jpeg files.
 """
 
+import importlib
+import mmap
+import re
 import struct
-from typing import BinaryIO
+import sys
+import zlib
+from typing import Any, BinaryIO, Union, cast
 
-from .exif_log import get_logger
-from .classes import ExifHeader
+from .exif_log import get_logger, get_trace
+from .classes import ExifHeader, TagIndex, TagSelection
 from .tags import DEFAULT_STOP_TAG
-from .utils import ord_
-from .heic import HEICExifFinder
-from .jpeg import find_jpeg_exif
+from .utils import ord_, file_reader, buffer_reader
 from .exceptions import InvalidExif, ExifNotFound
-from .xmp import XMP
 
 __version__ = '3.0.0'
 
 logger = get_logger()
 
+ENDIAN_NAMES = {
+    'I': 'Intel',
+    'M': 'Motorola',
+    '\x01': 'Adobe Ducky',
+    'd': 'XMP/Adobe unknown'
+}
+
+# names of the package imported on first use, by module, to keep "import exifread" fast
+# (Python 3.7 and later, they are imported with the package before)
+LAZY_ATTRIBUTES = {
+    'XMP': 'xmp',
+    'HEICExifFinder': 'heic',
+    'find_jpeg_exif': 'jpeg',
+    'process_files': 'batch',
+    'scan': 'scanner',
+    'LayoutCache': 'layout',
+    'extract_columns': 'columns',
+}
+
+# RDF part of an XMP packet
+XMP_RDF = re.compile(rb'<rdf:RDF.*?</rdf:RDF>', re.DOTALL)
+XMP_RDF_START = re.compile(rb'<rdf:RDF')
+
+# keyword of the PNG iTXt chunk holding the XMP packet
+PNG_XMP_KEYWORD = b'XML:com.adobe.xmp\x00'
+
+
+def __getattr__(name):
+    if name in LAZY_ATTRIBUTES:
+        module = importlib.import_module('.' + LAZY_ATTRIBUTES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
 
 def _find_tiff_exif(fh: BinaryIO) -> tuple:
     logger.debug("TIFF format recognized in data[0:2]")
@@ -25,7 +60,8 @@ def _find_tiff_exif(fh: BinaryIO) -> tuple:
     endian = fh.read(1)
     fh.read(1)
     offset = 0
-    return offset, endian
+    # the Exif data is the whole file
+    return offset, endian, None
 
 
 def _find_webp_exif(fh: BinaryIO) -> tuple:
@@ -39,63 +75,150 @@ def _find_webp_exif(fh: BinaryIO) -> tuple:
             data = fh.read(8)  # Chunk FourCC (32 bits) and Chunk Size (32 bits)
             if len(data) != 8:
                 raise InvalidExif("Invalid webp file chunk header.")
+            size = struct.unpack('<L', data[4:8])[0]
             if data[0:4] == b'EXIF':
                 offset = fh.tell()
                 endian = fh.read(1)
-                return offset, endian
-            size = struct.unpack('<L', data[4:8])[0]
+                return offset, endian, size
             fh.seek(size, 1)
     raise ExifNotFound("Webp file does not have exif data.")
 
 
+def _find_webp_exif_in_buffer(data) -> tuple:
+    logger.debug("WebP format recognized in data[0:4], data[8:12]")
+    if data[12:16] == b'VP8X' and data[16] & 8:
+        pos = 30
+        while True:
+            header = data[pos:pos + 8]  # Chunk FourCC (32 bits) and Chunk Size (32 bits)
+            if len(header) != 8:
+                raise InvalidExif("Invalid webp file chunk header.")
+            size = struct.unpack('<L', header[4:8])[0]
+            pos += 8
+            if header[0:4] == b'EXIF':
+                return pos, data[pos:pos + 1], size
+            pos += size
+    raise ExifNotFound("Webp file does not have exif data.")
+
+
 def _find_png_exif(fh: BinaryIO, data: bytes) -> tuple:
-    logger.debug("PNG format recognized in data[0:8]=%s", data[:8].hex())
+    trace = get_trace()
+    if trace:
+        trace("PNG format recognized in data[0:8]=%s", data[:8].hex())
     fh.seek(8)
 
     while True:
         data = fh.read(8)
         chunk = data[4:8]
-        logger.debug("PNG found chunk %s", chunk.decode("ascii"))
+        if trace:
+            trace("PNG found chunk %s", chunk.decode("ascii"))
 
         if chunk in (b'', b'IEND'):
             break
+        chunk_size = int.from_bytes(data[:4], "big")
         if chunk == b'eXIf':
             offset = fh.tell()
-            return offset, fh.read(1)
+            return offset, fh.read(1), chunk_size
 
-        chunk_size = int.from_bytes(data[:4], "big")
         fh.seek(fh.tell() + chunk_size + 4)
 
     raise ExifNotFound("PNG file does not have exif data.")
 
 
-def _get_xmp(fh: BinaryIO) -> bytes:
-    xmp_bytes = b''
-    logger.debug('XMP not in Exif, searching file for XMP info...')
-    xml_started = False
-    xml_finished = False
-    for line in fh:
-        # open_tag = line.find(b'<x:xmpmeta')
-        # close_tag = line.find(b'</x:xmpmeta>')
-        open_tag = line.find(b'<rdf:RDF')
-        close_tag = line.find(b'</rdf:RDF>')
-        if open_tag != -1:
-            xml_started = True
-            line = line[open_tag:]
-            logger.debug('XMP found opening tag at line position %s', open_tag)
-        if close_tag != -1:
-            logger.debug('XMP found closing tag at line position %s', close_tag)
-            line_offset = 0
-            if open_tag != -1:
-                line_offset = open_tag
-            line = line[:(close_tag - line_offset) + 12]
-            xml_finished = True
-        if xml_started:
-            xmp_bytes += line
-        if xml_finished:
+def _find_png_exif_in_buffer(data) -> tuple:
+    trace = get_trace()
+    if trace:
+        trace("PNG format recognized in data[0:8]=%s", bytes(data[:8]).hex())
+    pos = 8
+
+    while True:
+        header = data[pos:pos + 8]
+        chunk = bytes(header[4:8])
+        if trace:
+            trace("PNG found chunk %s", chunk.decode("ascii"))
+
+        if chunk in (b'', b'IEND'):
             break
-    logger.debug('XMP Finished searching for info')
-    return xmp_bytes
+        chunk_size = int.from_bytes(header[:4], "big")
+        pos += 8
+        if chunk == b'eXIf':
+            return pos, data[pos:pos + 1], chunk_size
+
+        pos += chunk_size + 4
+
+    raise ExifNotFound("PNG file does not have exif data.")
+
+
+def _find_webp_xmp(read_at) -> bytes:
+    pos = 12
+    while True:
+        header = read_at(pos, 8)  # Chunk FourCC (32 bits) and Chunk Size (32 bits)
+        if len(header) != 8:
+            return b''
+        size = struct.unpack('<L', header[4:8])[0]
+        if header[0:4] == b'XMP ':
+            return bytes(read_at(pos + 8, size))
+        # chunks are padded to an even size
+        pos += 8 + size + (size & 1)
+
+
+def _find_png_xmp(read_at) -> bytes:
+    pos = 8
+    while True:
+        header = read_at(pos, 8)
+        chunk = bytes(header[4:8])
+        if chunk in (b'', b'IEND'):
+            return b''
+        chunk_size = int.from_bytes(header[:4], "big")
+        if chunk == b'iTXt' and read_at(pos + 8, len(PNG_XMP_KEYWORD)) == PNG_XMP_KEYWORD:
+            text = bytes(read_at(pos + 8 + len(PNG_XMP_KEYWORD), chunk_size - len(PNG_XMP_KEYWORD)))
+            # skip the compression flag and method, language tag and translated keyword
+            fields = text[2:].split(b'\x00', 2)
+            if len(text) < 2 or len(fields) < 3:
+                logger.warning('PNG: truncated XMP chunk, skipped')
+                return b''
+            if not text[0]:
+                return fields[2]
+            try:
+                return zlib.decompress(fields[2])
+            except zlib.error as err:
+                logger.warning('PNG: invalid compressed XMP chunk, skipped: %s', err)
+                return b''
+        pos += 8 + chunk_size + 4
+
+
+def _find_xmp(read_at, hdr: ExifHeader, scan: int) -> bytes:
+    """
+    Locate the XMP packet through the structure of the file, and return its RDF part.
+
+    Only when the container has none, and ``scan`` is set, are the first
+    ``scan`` bytes of the file searched.
+    """
+    data = read_at(0, 12)
+    if data[0:2] in [b'II', b'MM']:
+        # tag 0x02BC of the first IFD, may be skipped from the tags in quick mode
+        ifds = hdr.list_ifd()
+        xmp_bytes = hdr.read_tag(ifds[0], 0x02BC) if ifds else b''
+    elif data[4:12] == b'ftypheic':
+        from .heic import HEICReaderExifFinder  # pylint: disable=import-outside-toplevel
+        xmp_bytes = HEICReaderExifFinder(read_at).find_xmp()
+    elif data[0:4] == b'RIFF' and data[8:12] == b'WEBP':
+        xmp_bytes = _find_webp_xmp(read_at)
+    elif data[0:2] == b'\xFF\xD8':
+        from .jpeg import find_jpeg_xmp  # pylint: disable=import-outside-toplevel
+        xmp_bytes = find_jpeg_xmp(read_at)
+    elif data[0:8] == b'\x89PNG\r\n\x1a\n':
+        xmp_bytes = _find_png_xmp(read_at)
+    else:
+        xmp_bytes = b''
+    if not xmp_bytes and scan:
+        logger.debug('XMP not found in the file structure, searching the first %d bytes...', scan)
+        xmp_bytes = read_at(0, scan)
+    match = XMP_RDF.search(xmp_bytes)
+    if match:
+        return match.group()
+    # not closed, take everything up to the end
+    match = XMP_RDF_START.search(xmp_bytes)
+    return bytes(xmp_bytes[match.start():]) if match else b''
 
 
 def _determine_type(fh: BinaryIO) -> tuple:
@@ -105,57 +228,120 @@ def _determine_type(fh: BinaryIO) -> tuple:
     data = fh.read(12)
     if data[0:2] in [b'II', b'MM']:
         # it's a TIFF file
-        offset, endian = _find_tiff_exif(fh)
+        offset, endian, length = _find_tiff_exif(fh)
     elif data[4:12] == b'ftypheic':
+        from .heic import HEICExifFinder  # pylint: disable=import-outside-toplevel
         fh.seek(0)
         heic = HEICExifFinder(fh)
-        offset, endian = heic.find_exif()
+        offset, endian, length = heic.find_exif()
     elif data[0:4] == b'RIFF' and data[8:12] == b'WEBP':
-        offset, endian = _find_webp_exif(fh)
+        offset, endian, length = _find_webp_exif(fh)
     elif data[0:2] == b'\xFF\xD8':
         # it's a JPEG file
-        offset, endian, fake_exif = find_jpeg_exif(fh, data, fake_exif)
+        from .jpeg import find_jpeg_exif  # pylint: disable=import-outside-toplevel
+        offset, endian, fake_exif, length = find_jpeg_exif(fh, data, fake_exif)
     elif data[0:8] == b'\x89PNG\r\n\x1a\n':
-        offset, endian = _find_png_exif(fh, data)
+        offset, endian, length = _find_png_exif(fh, data)
     else:
         # file format not recognized
         raise ExifNotFound("File format not recognized.")
-    return offset, endian, fake_exif
+    return offset, endian, fake_exif, length
 
 
-def process_file(fh: BinaryIO, stop_tag=DEFAULT_STOP_TAG,
-                 details=True, strict=False, debug=False,
-                 truncate_tags=False, auto_seek=True,
-                 xmp=True, clean=False):
-    """
-    Process an image file (expects an open file object).
+def _determine_buffer_type(data) -> tuple:
+    # by default do not fake an EXIF beginning
+    fake_exif = 0
 
-    This is the function that has to deal with all the arbitrary nasty bits
-    of the EXIF standard.
-    """
+    if data[0:2] in [b'II', b'MM']:
+        # it's a TIFF file, the Exif data is the whole file
+        logger.debug("TIFF format recognized in data[0:2]")
+        offset, endian, length = 0, data[0:1], None
+    elif data[4:12] == b'ftypheic':
+        from .heic import HEICReaderExifFinder  # pylint: disable=import-outside-toplevel
+        heic = HEICReaderExifFinder(buffer_reader(data))
+        offset, endian, length = heic.find_exif()
+    elif data[0:4] == b'RIFF' and data[8:12] == b'WEBP':
+        offset, endian, length = _find_webp_exif_in_buffer(data)
+    elif data[0:2] == b'\xFF\xD8':
+        # it's a JPEG file
+        from .jpeg import find_jpeg_exif_in_buffer  # pylint: disable=import-outside-toplevel
+        offset, endian, fake_exif, length = find_jpeg_exif_in_buffer(data)
+    elif data[0:8] == b'\x89PNG\r\n\x1a\n':
+        offset, endian, length = _find_png_exif_in_buffer(data)
+    else:
+        # file format not recognized
+        raise ExifNotFound("File format not recognized.")
+    return offset, endian, fake_exif, length
 
-    if auto_seek:
-        fh.seek(0)
 
-    try:
-        offset, endian, fake_exif = _determine_type(fh)
-    except ExifNotFound as err:
-        logger.warning(err)
-        return {}
-    except InvalidExif as err:
-        logger.debug(err)
-        return {}
+def _read_exif_segment(fh: BinaryIO, offset: int, length) -> bytes:
+    """Read the whole Exif segment in one go, ``length`` of None means up to the end of file."""
+    fh.seek(offset)
+    if length is None:
+        data = fh.read()
+    else:
+        data = fh.read(max(length, 0))
+    # leave the file where the Exif data starts, the XMP search reads on from there
+    fh.seek(offset)
+    return data
 
+
+def _make_header(fh, endian, offset, fake_exif, strict, debug, details, truncate_tags,
+                 data, data_offset, lazy, tags=None, layout_cache=None) -> ExifHeader:
     endian = chr(ord_(endian[0]))
     # deal with the EXIF info we found
-    logger.debug("Endian format is %s (%s)", endian, {
-        'I': 'Intel',
-        'M': 'Motorola',
-        '\x01': 'Adobe Ducky',
-        'd': 'XMP/Adobe unknown'
-    }[endian])
-
-    hdr = ExifHeader(fh, endian, offset, fake_exif, strict, debug, details, truncate_tags)
+    # unknown byte orders are rejected here (KeyError)
+    endian_name = ENDIAN_NAMES[endian]
+    trace = get_trace()
+    if trace:
+        trace("Endian format is %s (%s)", endian, endian_name)
+
+    selection = TagSelection(tags) if tags is not None else None
+    return ExifHeader(fh, endian, offset, fake_exif, strict, debug, details, truncate_tags,
+                      data=data, data_offset=data_offset, lazy=lazy, selection=selection,
+                      layout_cache=layout_cache)
+
+
+def _process_selected(hdr: ExifHeader, stop_tag, details, xmp, clean, find_xmp):
+    """Walk only the IFDs holding the selected tags, until they are all found."""
+    selection = hdr.selection
+    ifd_list = hdr.list_ifd()
+    # the sub-IFDs are walked from the pointers of the first IFD
+    if ifd_list and selection.visits('Image'):
+        hdr.dump_ifd(ifd_list[0], 'Image', stop_tag=stop_tag)
+    exif_off = hdr.tags.get(('Image', 'ExifOffset'))
+    if exif_off and selection.visits('EXIF'):
+        hdr.dump_ifd(exif_off.values, 'EXIF', stop_tag=stop_tag)
+
+    if details and selection.visits('MakerNote') and ('EXIF', 'MakerNote') in hdr.tags \
+            and ('Image', 'Make') in hdr.tags:
+        hdr.decode_maker_note()
+
+    for ctr, ifd in enumerate(ifd_list[1:], 1):
+        ifd_name = 'Thumbnail' if ctr == 1 else 'IFD %d' % ctr
+        if selection.visits(ifd_name):
+            hdr.dump_ifd(ifd, ifd_name, stop_tag=stop_tag)
+    if details and len(ifd_list) > 1 and selection.extras & {'JPEGThumbnail', 'TIFFThumbnail'}:
+        hdr.extract_tiff_thumbnail(ifd_list[1])
+        hdr.extract_jpeg_thumbnail()
+
+    hdr.drop_unselected()
+    if xmp and 'XMP' in selection.extras:
+        xmp_bytes = find_xmp()
+        if xmp_bytes:
+            return hdr.parse_xmp(xmp_bytes)
+
+    if not clean:
+        return hdr.tags
+    return hdr.clean_tags()
+
+
+def _process_exif(hdr: ExifHeader, stop_tag, details, debug, xmp, clean, find_xmp):
+    """Walk the IFDs of a located Exif segment, ``find_xmp`` locates the XMP packet."""
+    if hdr.selection is not None:
+        return _process_selected(hdr, stop_tag, details, xmp, clean, find_xmp)
+
+    trace = hdr.trace
     ifd_list = hdr.list_ifd()
     thumb_ifd = 0
     ctr = 0
@@ -167,11 +353,12 @@ def process_file(fh: BinaryIO, stop_tag=DEFAULT_STOP_TAG,
             thumb_ifd = ifd
         else:
             ifd_name = 'IFD %d' % ctr
-        logger.debug('IFD %d (%s) at offset %s:', ctr, ifd_name, ifd)
+        if trace:
+            trace('IFD %d (%s) at offset %s:', ctr, ifd_name, ifd)
         hdr.dump_ifd(ifd, ifd_name, stop_tag=stop_tag)
         ctr += 1
     # EXIF IFD
-    exif_off = hdr.tags.get('Image ExifOffset')
+    exif_off = hdr.tags.get(('Image', 'ExifOffset'))
     if exif_off:
         logger.debug('Exif SubIFD at offset %s:', exif_off.values)
         hdr.dump_ifd(exif_off.values, 'EXIF', stop_tag=stop_tag)
@@ -179,7 +366,7 @@ def process_file(fh: BinaryIO, stop_tag=DEFAULT_STOP_TAG,
     # deal with MakerNote contained in EXIF IFD
     # (Some apps use MakerNote tags but do not use a format for which we
     # have a description, do not process these).
-    if details and 'EXIF MakerNote' in hdr.tags and 'Image Make' in hdr.tags:
+    if details and ('EXIF', 'MakerNote') in hdr.tags and ('Image', 'Make') in hdr.tags:
         hdr.decode_maker_note()
 
     # extract thumbnails
@@ -190,26 +377,18 @@ def process_file(fh: BinaryIO, stop_tag=DEFAULT_STOP_TAG,
     # parse XMP tags (experimental)
     if debug and details:
         # Easy we already have them
-        xmp_tag = hdr.tags.get('Image ApplicationNotes')
+        xmp_tag = hdr.tags.get(('Image', 'ApplicationNotes'))
         if xmp_tag:
             logger.debug('XMP present in Exif')
             xmp_bytes = bytes(xmp_tag.values)
-        # We need to look in the entire file for the XML
+        # We need to look in the file for the XML
         else:
-            xmp_bytes = _get_xmp(fh)
+            xmp_bytes = find_xmp()
         if xmp_bytes:
             hdr.dump_xmp(xmp_bytes)
     
     if xmp:
-        # This doesn't find the bytes.
-        # # Easy we already have them
-        # xmp_tag = hdr.tags.get('Image ApplicationNotes')
-        # if xmp_tag:
-        #     logger.debug('XMP present in Exif')
-        #     xmp_bytes = bytes(xmp_tag.values)
-        # # We need to look in the entire file for the XML
-        # else:
-        xmp_bytes = _get_xmp(fh)
+        xmp_bytes = find_xmp()
         if xmp_bytes:
             return hdr.parse_xmp(xmp_bytes)
 
@@ -217,3 +396,204 @@ def process_file(fh: BinaryIO, stop_tag=DEFAULT_STOP_TAG,
         return hdr.tags
     else:
         return hdr.clean_tags()
+
+
+def _process_deduped(hdr: ExifHeader, length: int, stop_tag, details, strict, debug, truncate_tags,
+                     xmp, clean, tags, find_xmp, segment_cache):
+    """Same as ``_process_exif()``, reusing the tags decoded from an identical Exif segment and XMP packet."""
+    start = hdr.offset - hdr.data_offset
+    # a view, not to copy the segment, released before a memory-mapped file is closed
+    with memoryview(hdr.data) as view:
+        segment = view[start:start + max(length, 0)]
+        segment_digest = segment_cache.digest(segment)
+        segment.release()
+    xmp_bytes = find_xmp() if xmp or (debug and details) else b''
+    key = (segment_digest, segment_cache.digest(xmp_bytes), hdr.endian, hdr.fake_exif,
+           stop_tag, details, strict, debug, truncate_tags, xmp, clean,
+           None if tags is None else frozenset(tags))
+    result = segment_cache.get(key)
+    if result is None:
+        result = segment_cache.put(key, _process_exif(hdr, stop_tag, details, debug, xmp, clean,
+                                                      lambda: xmp_bytes))
+    return result
+
+
+def process_file(fh: Union[BinaryIO, mmap.mmap], stop_tag=DEFAULT_STOP_TAG,
+                 details=True, strict=False, debug=False,
+                 truncate_tags=False, auto_seek=True,
+                 xmp=True, clean=False, buffered=False, lazy=False, xmp_scan=0, tags=None,
+                 layout_cache=None, segment_cache=None):
+    """
+    Process an image file (expects an open file object).
+
+    This is the function that has to deal with all the arbitrary nasty bits
+    of the EXIF standard.
+
+    With ``buffered``, the Exif segment is read into memory once and decoded
+    from there instead of seeking and reading the file for every field.
+    A memory-mapped file (``mmap.mmap``) is decoded in place, without copy.
+    TIFF based files (DNG, most raw formats...), whose Exif data is the
+    whole file, are not read into memory: they are decoded through the
+    file handle, use ``process_path()`` to map them.
+
+    With ``lazy``, tag values and printables are only decoded when first
+    accessed. This implies ``buffered``, a memory-mapped file must then be
+    left open as long as the tags are used. The tags of TIFF based files
+    read through a file handle are decoded at once.
+
+    The XMP packet is located through the structure of the file (JPEG APP1
+    segment, TIFF tag, PNG iTXt chunk, WebP XMP chunk, HEIC item). Set
+    ``xmp_scan`` to also search that many bytes from the start of the file
+    when the structure holds none.
+
+    With ``tags``, a set of names, only the tags given are decoded and the
+    walk stops once they are all found. Names are tag names looked for in
+    the first IFD and the EXIF, GPS and Interoperability IFDs ('Orientation'),
+    tag keys ('GPS GPSLatitude'), or IFD names for all their tags ('GPS').
+    The makernote, thumbnails ('JPEGThumbnail', 'TIFFThumbnail') and XMP
+    ('XMP') are only processed when selected.
+
+    With a ``LayoutCache`` as ``layout_cache``, the IFDs laid out as in a
+    file processed before (same camera model) are processed without
+    reading all their entries.
+
+    With a ``SegmentCache`` (``exifread.cache``) as ``segment_cache``, the
+    tags of a file whose Exif segment and XMP packet are identical to those
+    of a file processed before (burst shots, copies...) are not decoded
+    again: a copy of the tags decoded then is returned. TIFF based files
+    (DNG, most raw formats...), whose Exif data is the whole file, are
+    decoded as usual: hashing them would read them entirely.
+    """
+    try:
+        return _process_file(fh, stop_tag, details, strict, debug, truncate_tags, auto_seek,
+                             xmp, clean, buffered, lazy, xmp_scan, tags, layout_cache, segment_cache)
+    except ExifNotFound as err:
+        logger.warning(err)
+        return {}
+    except InvalidExif as err:
+        logger.debug(err)
+        return {}
+
+
+def _process_file(fh: Union[BinaryIO, mmap.mmap], stop_tag=DEFAULT_STOP_TAG,
+                  details=True, strict=False, debug=False,
+                  truncate_tags=False, auto_seek=True,
+                  xmp=True, clean=False, buffered=False, lazy=False, xmp_scan=0, tags=None,
+                  layout_cache=None, segment_cache=None):
+    """Same as ``process_file()``, raising ExifNotFound or InvalidExif when there is no Exif data."""
+    if auto_seek:
+        fh.seek(0)
+
+    # a memory map reads and seeks as a file does
+    offset, endian, fake_exif, length = _determine_type(cast(BinaryIO, fh))
+
+    data = None  # type: Any
+    data_offset = 0
+    if isinstance(fh, mmap.mmap):
+        # the whole file is already in memory
+        data = fh
+    elif length is not None and (buffered or lazy or segment_cache is not None):
+        data = _read_exif_segment(fh, offset, length)
+        data_offset = offset
+    # the tags of a TIFF file read through its handle cannot outlive it, decode them now
+    lazy = lazy and data is not None
+    hdr = _make_header(fh, endian, offset, fake_exif, strict, debug, details, truncate_tags,
+                       data, data_offset, lazy, tags, layout_cache)
+
+    def find_xmp():
+        return _find_xmp(file_reader(fh), hdr, xmp_scan)
+
+    if segment_cache is not None and length is not None:
+        return _process_deduped(hdr, length, stop_tag, details, strict, debug, truncate_tags,
+                                xmp, clean, tags, find_xmp, segment_cache)
+    return _process_exif(hdr, stop_tag, details, debug, xmp, clean, find_xmp)
+
+
+def index_file(fh: BinaryIO, auto_seek=True) -> TagIndex:
+    """
+    Map the IFD entries of an image file, without decoding their values.
+
+    Returns a ``TagIndex`` of the (IFD, tag ID, field type, count, value
+    offset) of the entries of the IFDs, of the EXIF, GPS and Interoperability
+    sub-IFDs and of the makernote. Empty when there is no Exif data.
+    """
+    if auto_seek:
+        fh.seek(0)
+    try:
+        offset, endian, fake_exif, _ = _determine_type(fh)
+    except ExifNotFound as err:
+        logger.warning(err)
+        return TagIndex()
+    except InvalidExif as err:
+        logger.debug(err)
+        return TagIndex()
+
+    hdr = _make_header(fh, endian, offset, fake_exif, False, False, False, False,
+                       fh if isinstance(fh, mmap.mmap) else None, 0, False)
+    return hdr.index()
+
+
+def process_bytes(buf, stop_tag=DEFAULT_STOP_TAG,
+                  details=True, strict=False, debug=False,
+                  truncate_tags=False, xmp=True, clean=False, lazy=False, xmp_scan=0, tags=None,
+                  layout_cache=None, segment_cache=None):
+    """
+    Process an image file held in memory (bytes, bytearray, memoryview...).
+
+    Same as ``process_file()``, but the Exif data is located and decoded by
+    slicing the buffer, it is neither wrapped in a file object nor copied.
+    With ``lazy``, the buffer must be left unchanged as long as the tags are used.
+    """
+    if not isinstance(buf, (bytes, bytearray)):
+        buf = memoryview(buf).cast('B')
+
+    try:
+        offset, endian, fake_exif, length = _determine_buffer_type(buf)
+    except ExifNotFound as err:
+        logger.warning(err)
+        return {}
+    except InvalidExif as err:
+        logger.debug(err)
+        return {}
+
+    hdr = _make_header(None, endian, offset, fake_exif, strict, debug, details, truncate_tags,
+                       buf, 0, lazy, tags, layout_cache)
+
+    def find_xmp():
+        return _find_xmp(buffer_reader(buf), hdr, xmp_scan)
+
+    if segment_cache is not None and length is not None:
+        return _process_deduped(hdr, length, stop_tag, details, strict, debug, truncate_tags,
+                                xmp, clean, tags, find_xmp, segment_cache)
+    return _process_exif(hdr, stop_tag, details, debug, xmp, clean, find_xmp)
+
+
+def process_path(path: str, **kwargs) -> dict:
+    """
+    Process an image file given its path.
+
+    The file is memory-mapped so that only the pages holding the Exif
+    data are ever read, this pays off on large TIFF and DNG files.
+    Options are the same as for ``process_file()``.
+    """
+    with open(path, 'rb') as fh:
+        if kwargs.get('lazy'):
+            # lazy tags outlive the mapping, read the Exif segment instead
+            return process_file(fh, **kwargs)
+        try:
+            view = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty file or not mappable (e.g. a pipe)
+            return process_file(fh, **kwargs)
+        with view:
+            return process_file(view, **kwargs)
+
+
+if sys.version_info < (3, 7):
+    # no module __getattr__() (PEP 562), import the lazy attributes now
+    for _name, _module in LAZY_ATTRIBUTES.items():
+        try:
+            globals()[_name] = getattr(importlib.import_module('.' + _module, __name__), _name)
+        except ImportError:
+            # optional dependency not installed
+            pass
@@ -0,0 +1,228 @@
+"""
+Read Exif metadata without blocking an asyncio event loop.
+
+The container is sniffed and the Exif segment fetched through an async
+reader, any object with a ``read_at(offset, size)`` coroutine returning
+``size`` bytes, fewer only at the end of the file. The segment is then
+decoded from memory. TIFF files, whose Exif data is the whole file, are
+decoded as their ranges are fetched.
+"""
+
+import asyncio
+from typing import BinaryIO, Iterable, Optional
+
+from . import _determine_buffer_type, _find_xmp, _make_header, _process_exif
+from .exceptions import ExifNotFound, InvalidExif
+from .exif_log import get_logger
+from .tags import DEFAULT_STOP_TAG
+from .utils import buffer_reader
+
+logger = get_logger()
+
+# bytes fetched at least by every read, the Exif data of most files is in the first ones
+READ_AHEAD = 64 * 1024
+
+
+class _Missing(Exception):
+    """Bytes not fetched yet were sliced."""
+
+    def __init__(self, offset: int, size: int):
+        super().__init__(offset, size)
+        self.offset = offset
+        self.size = size
+
+
+class _RangeCache:
+    """
+    The ranges of a file fetched so far, sliced like the whole file in memory.
+
+    Slicing bytes which are not fetched yet raises ``_Missing``, past the
+    end of the file (once known) comes back short.
+    """
+
+    def __init__(self):
+        self.blocks = []  # type: list
+        self.size = None
+
+    def add(self, offset: int, data: bytes, requested: int) -> None:
+        self.blocks.append((offset, data))
+        if len(data) < requested:
+            self.size = offset + len(data)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            value = self[key:key + 1]
+            if not value:
+                raise IndexError('offset out of range')
+            return value[0]
+        start = key.start or 0
+        stop = key.stop
+        if self.size is not None:
+            start = min(start, self.size)
+            stop = min(stop, self.size)
+        if stop <= start:
+            return b''
+        for offset, data in self.blocks:
+            if offset <= start and stop <= offset + len(data):
+                return data[start - offset:stop - offset]
+        raise _Missing(start, stop - start)
+
+
+async def _fetch(reader, cache: _RangeCache, func):
+    """Return ``func(cache)``, fetching the ranges it slices until they are all there."""
+    while True:
+        try:
+            return func(cache)
+        except _Missing as missing:
+            size = max(missing.size, READ_AHEAD)
+            cache.add(missing.offset, await reader.read_at(missing.offset, size), size)
+
+
+class _RangeFile:
+    """A file reading the ranges of a ``_RangeCache``, bytes not fetched yet raise ``_Missing``."""
+
+    def __init__(self, cache: _RangeCache):
+        self.cache = cache
+        self.pos = 0
+
+    def seek(self, pos: int) -> int:
+        if pos < 0:
+            raise ValueError('negative seek value %d' % pos)
+        self.pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def read(self, size: int) -> bytes:
+        data = bytes(self.cache[self.pos:self.pos + max(size, 0)])
+        self.pos += len(data)
+        return data
+
+
+class AsyncFileReader:
+    """Read ranges of an async file object, with ``seek()`` and ``read()`` coroutines (aiofiles...)."""
+
+    def __init__(self, fh):
+        self.fh = fh
+
+    async def read_at(self, offset: int, size: int) -> bytes:
+        await self.fh.seek(offset)
+        return await self.fh.read(size)
+
+
+class LocalRangeReader:
+    """
+    Read ranges of a local file on the default executor.
+
+    Stands in for a remote range reader (HTTP range requests, object
+    storage...), one read at a time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None  # type: Optional[BinaryIO]
+
+    def _read(self, offset: int, size: int) -> bytes:
+        if self._fh is None:
+            # kept open across reads, until close()
+            self._fh = open(self.path, 'rb')  # pylint: disable=consider-using-with
+        self._fh.seek(offset)
+        return self._fh.read(size)
+
+    async def read_at(self, offset: int, size: int) -> bytes:
+        return await asyncio.get_event_loop().run_in_executor(None, self._read, offset, size)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+async def _process_reader(reader, stop_tag=DEFAULT_STOP_TAG,
+                          details=True, strict=False, debug=False,
+                          truncate_tags=False, xmp=True, clean=False, lazy=False, xmp_scan=0,
+                          tags=None, layout_cache=None):
+    cache = _RangeCache()
+    offset, endian, fake_exif, length = await _fetch(reader, cache, _determine_buffer_type)
+    if length is None:
+        # TIFF file, the Exif data is the whole file: it is decoded again from
+        # the start each time it reads a range not fetched yet, and not lazily
+        def decode(data):
+            hdr = _make_header(_RangeFile(data), endian, offset, fake_exif, strict, debug, details,
+                               truncate_tags, None, 0, False, tags, layout_cache)
+            return _process_exif(hdr, stop_tag, details, debug, xmp, clean,
+                                 lambda: _find_xmp(buffer_reader(data), hdr, xmp_scan))
+        return await _fetch(reader, cache, decode)
+
+    data = await _fetch(reader, cache, lambda data: data[offset:offset + max(length, 0)])
+    hdr = _make_header(None, endian, offset, fake_exif, strict, debug, details, truncate_tags,
+                       data, offset, lazy, tags, layout_cache)
+    xmp_bytes = b''
+    if (xmp and (tags is None or 'XMP' in tags)) or (debug and details):
+        xmp_bytes = await _fetch(reader, cache,
+                                 lambda data: _find_xmp(buffer_reader(data), hdr, xmp_scan))
+    return _process_exif(hdr, stop_tag, details, debug, xmp, clean, lambda: xmp_bytes)
+
+
+async def _process_source(source, kwargs: dict):
+    """Same as ``process_file_async()``, raising ExifNotFound or InvalidExif when there is no Exif data."""
+    if isinstance(source, str):
+        async with LocalRangeReader(source) as reader:
+            return await _process_reader(reader, **kwargs)
+    if not hasattr(source, 'read_at'):
+        source = AsyncFileReader(source)
+    return await _process_reader(source, **kwargs)
+
+
+async def process_file_async(source, **kwargs):
+    """
+    Process an image file without blocking the event loop.
+
+    ``source`` is a path, read on the default executor, an async file
+    object or an async range reader (see ``LocalRangeReader``).
+
+    Only the ranges needed to find the Exif data are fetched, in blocks
+    of ``READ_AHEAD`` bytes, then the segment is decoded from memory. The
+    IFDs of TIFF files are decoded as their ranges are fetched, the other
+    ranges of the file are not. Options are the same as for
+    ``process_bytes()``, but ``segment_cache``.
+    """
+    try:
+        return await _process_source(source, kwargs)
+    except ExifNotFound as err:
+        logger.warning(err)
+        return {}
+    except InvalidExif as err:
+        logger.debug(err)
+        return {}
+
+
+async def gather_metadata(sources: Iterable, limit=16, **kwargs) -> list:
+    """
+    Process many image files, at most ``limit`` at a time.
+
+    Returns the tags in the order of ``sources``. When a file cannot be
+    processed, the exception is returned in place of its tags, as with
+    ``process_files()``. Options are the same as for ``process_file_async()``.
+    """
+    sources = list(sources)
+    results = [None] * len(sources)  # type: list
+    pending = iter(enumerate(sources))
+
+    async def worker():
+        # the workers share the iterator, each takes the next source when done
+        for index, source in pending:
+            try:
+                results[index] = await _process_source(source, kwargs)
+            except Exception as err:  # pylint: disable=broad-except
+                results[index] = err
+
+    await asyncio.gather(*(worker() for _ in range(min(limit, len(sources)))))
+    return results
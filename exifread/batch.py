@@ -0,0 +1,65 @@
+"""
+Process many image files at once.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, Tuple
+
+from . import _process_file
+
+# number of files queued per worker thread, ``paths`` may be a long generator
+QUEUED_PER_WORKER = 4
+
+
+def _process_path(path: str, kwargs: dict):
+    """Return the tags of a file, or the exception raised while processing it."""
+    try:
+        with open(path, 'rb') as fh:
+            return _process_file(fh, **kwargs)
+    except Exception as err:  # pylint: disable=broad-except
+        return err
+
+
+def process_files(paths: Iterable[str], workers=None, ordered=False, **kwargs) -> Iterator[Tuple[str, object]]:
+    """
+    Process image files given their paths, on a pool of ``workers`` threads.
+
+    Yields (path, tags) tuples as the files are done, or in the order of
+    ``paths`` with ``ordered``. When a file cannot be processed, the exception
+    is yielded in place of its tags (``ExifNotFound`` when there is no Exif
+    data, ``OSError``...) and the other files are processed all the same.
+
+    Opening and reading the files is done in parallel, this pays off when
+    I/O latency dominates (network storage...). Options are the same as for
+    ``process_file()``.
+    """
+    if workers is None:
+        # same default as ThreadPoolExecutor
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    limit = workers * QUEUED_PER_WORKER
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if ordered:
+            queued = deque()  # type: deque
+            for path in paths:
+                queued.append((path, executor.submit(_process_path, path, kwargs)))
+                if len(queued) >= limit:
+                    path, future = queued.popleft()
+                    yield path, future.result()
+            while queued:
+                path, future = queued.popleft()
+                yield path, future.result()
+        else:
+            running = {}
+            for path in paths:
+                running[executor.submit(_process_path, path, kwargs)] = path
+                if len(running) >= limit:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield running.pop(future), future.result()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield running.pop(future), future.result()
@@ -0,0 +1,392 @@
+"""
+Caches of the tags of image files, in memory or in an SQLite database.
+"""
+
+import abc
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+from . import process_file, process_path
+from .classes import IfdTag, TagsView
+
+# options of process_file() which do not change the tags returned
+UNKEYED_OPTIONS = ('auto_seek', 'buffered', 'lazy', 'layout_cache', 'segment_cache')
+
+# default values of the options of process_file(), options given as such are left out of the keys
+DEFAULT_OPTIONS = {
+    name: parameter.default for name, parameter in inspect.signature(process_file).parameters.items()
+    if parameter.default is not inspect.Parameter.empty
+}
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS tags ('
+    ' path TEXT NOT NULL, options TEXT NOT NULL,'
+    ' size INTEGER NOT NULL, mtime INTEGER NOT NULL, inode INTEGER NOT NULL,'
+    ' data BLOB NOT NULL, used INTEGER NOT NULL,'
+    ' PRIMARY KEY (path, options))',
+    'CREATE INDEX IF NOT EXISTS tags_used ON tags (used)',
+)
+
+
+def options_key(kwargs: dict) -> str:
+    """Return the options of process_file() which change the tags, as a string."""
+    options = []
+    for name, value in sorted(kwargs.items()):
+        if name in UNKEYED_OPTIONS or (name in DEFAULT_OPTIONS and value == DEFAULT_OPTIONS[name]):
+            continue
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        options.append('%s=%r' % (name, value))
+    return ','.join(options)
+
+
+def _freeze(value):
+    """Return a read-only copy of a tag value, lists as tuples."""
+    if isinstance(value, IfdTag):
+        return FrozenTag(value)
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, bytearray):
+        return bytes(value)
+    return value
+
+
+def freeze(tags):
+    """Return a read-only copy of the tags returned by ``process_file()``, to be shared."""
+    if isinstance(tags, TagsView):
+        return TagsView({key: _freeze(tag) for key, tag in tags.entries()})
+    return _freeze(tags)
+
+
+def _copy(value):
+    """Return a copy of a tag value of the same types, not sharing any mutable part."""
+    if isinstance(value, IfdTag):
+        return IfdTag(_copy(value.printable), value.tag, value.field_type, _copy(value.values),
+                      value.field_offset, value.field_length)
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, bytearray):
+        return bytearray(value)
+    return value
+
+
+def copy_tags(tags):
+    """Return a copy of the tags returned by ``process_file()``, to be modified apart from them."""
+    if isinstance(tags, TagsView):
+        return TagsView({key: _copy(tag) for key, tag in tags.entries()})
+    return _copy(tags)
+
+
+def size_of(value) -> int:
+    """Return the approximate memory taken by a value and the ones it holds, in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, IfdTag):
+        size += size_of(value.printable) + size_of(value.values)
+    elif isinstance(value, TagsView):
+        size += sum(size_of(key) + size_of(tag) for key, tag in value.entries())
+    elif isinstance(value, (tuple, list)):
+        size += sum(size_of(item) for item in value)
+    elif isinstance(value, (dict, MappingProxyType)):
+        size += sum(size_of(key) + size_of(item) for key, item in value.items())
+    return size
+
+
+class FrozenTag(IfdTag):
+    """Read-only copy of a tag, shared by the callers of a ``MemoryCache``."""
+
+    __slots__ = ()
+
+    def __init__(self, tag: IfdTag):  # pylint: disable=super-init-not-called
+        # the printable is kept as decoded, it is what the tag renders as
+        for name, value in (('_decode', None), ('_printable', tag.printable),
+                            ('_values', _freeze(tag.values)), ('tag', tag.tag),
+                            ('field_type', tag.field_type), ('field_offset', tag.field_offset),
+                            ('field_length', tag.field_length)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('cached tags are read-only')
+
+    def __reduce__(self):
+        return FrozenTag, (IfdTag(self.printable, self.tag, self.field_type, self.values,
+                                  self.field_offset, self.field_length), )
+
+
+class _Cache(abc.ABC):
+    """Looks up the tags of files by path and options, when the files did not change since."""
+
+    @abc.abstractmethod
+    def get(self, path: str, stat: os.stat_result, options: str):
+        """Return the tags cached for a file, None when they are not or the file changed since."""
+
+    @abc.abstractmethod
+    def put(self, path: str, stat: os.stat_result, options: str, tags):
+        """Cache the tags of a file, returns the tags to hand out."""
+
+    def process_path(self, path: str, **kwargs):
+        """
+        Return the tags of an image file given its path, from the cache when
+        the file did not change since it was processed with the same options.
+
+        Options are the same as for ``process_file()``. Files without Exif
+        data are cached too, the exceptions raised are not.
+        """
+        stat = os.stat(path)
+        options = options_key(kwargs)
+        tags = self.get(path, stat, options)
+        if tags is None:
+            tags = self.put(path, stat, options, process_path(path, **kwargs))
+        return tags
+
+
+class MemoryCache(_Cache):
+    """
+    Tags of the files processed, kept in memory for the process.
+
+    Same as ``SQLiteCache``, but the tags are kept as read-only copies
+    (``FrozenTag``, lists of values as tuples), the same objects being returned to
+    every caller. Lazy tags are decoded first.
+
+    The entries used least recently are evicted past ``max_entries`` entries
+    or ``max_size`` bytes (approximately), None for no limit.
+    """
+
+    def __init__(self, max_entries=4096, max_size=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def get(self, path: str, stat: os.stat_result, options: str):
+        key = (path, options)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            identity, tags, size = entry
+            if identity != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                self.misses += 1
+                self.invalidations += 1
+                self._size -= size
+                del self._entries[key]
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return tags
+
+    def put(self, path: str, stat: os.stat_result, options: str, tags):
+        tags = freeze(tags)
+        size = size_of(tags)
+        key = (path, options)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[2]
+            self._entries[key] = ((stat.st_size, stat.st_mtime_ns, stat.st_ino), tags, size)
+            self._size += size
+            while self._entries and (
+                    (self.max_entries is not None and len(self._entries) > self.max_entries)
+                    or (self.max_size is not None and self._size > self.max_size)):
+                self._size -= self._entries.popitem(last=False)[1][2]
+                self.evictions += 1
+        return tags
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SegmentCache:
+    """
+    Tags decoded from the Exif segments seen, by digest of the segment and
+    of the XMP packet, to reuse them for files carrying identical ones
+    (burst shots, exports, copies...). Used as the ``segment_cache`` option
+    of ``process_file()``, whatever the files.
+
+    The tags are kept for up to ``maxsize`` segments, every file gets its
+    own copy, of the same types as without the cache. ``hits`` counts the files whose tags were reused,
+    ``misses`` the files decoded, ``ratio`` is the share of files reused.
+    A cache can be shared by threads.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(data) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    @property
+    def ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key):
+        """Return a copy of the tags decoded for a segment, None when it was not seen."""
+        with self._lock:
+            tags = self._results.get(key)
+            if tags is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._results.move_to_end(key)
+        return copy_tags(tags)
+
+    def put(self, key, tags):
+        """Keep a copy of the tags decoded for a segment, returns the tags."""
+        # lazy tags are decoded by the copy
+        kept = copy_tags(tags)
+        with self._lock:
+            self._results[key] = kept
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return tags
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+class SQLiteCache(_Cache):
+    """
+    Tags of the files processed, kept in an SQLite database at ``path``
+    (':memory:' for none).
+
+    Entries are looked up by path and options, and only used when the file
+    still has the size, modification time and inode it had when processed,
+    which a ``stat()`` tells without opening it. Entries of files changed
+    since are replaced.
+
+    The entries used least recently are evicted once they take more than
+    ``max_size`` bytes, None for no limit. ``hits`` counts the tags taken
+    from the cache, ``misses`` the files processed, ``invalidations`` the
+    entries of changed files and ``evictions`` the entries evicted.
+
+    Tags are stored pickled, only open databases you trust. A cache can be
+    shared by threads.
+    """
+
+    def __init__(self, path: str, max_size=512 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        self._clock, self._size = self._db.execute(
+            'SELECT COALESCE(MAX(used), 0), COALESCE(SUM(LENGTH(data)), 0) FROM tags').fetchone()
+        if max_size is not None and self._size > max_size:
+            self._evict()
+            self._db.commit()
+
+    def get(self, path: str, stat: os.stat_result, options: str):
+        with self._lock:
+            row = self._db.execute('SELECT size, mtime, inode, data FROM tags WHERE path = ? AND options = ?',
+                                   (path, options)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[:3] != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                self.misses += 1
+                self.invalidations += 1
+                self._size -= len(row[3])
+                self._db.execute('DELETE FROM tags WHERE path = ? AND options = ?', (path, options))
+                self._db.commit()
+                return None
+            self.hits += 1
+            self._clock += 1
+            self._db.execute('UPDATE tags SET used = ? WHERE path = ? AND options = ?',
+                             (self._clock, path, options))
+            self._db.commit()
+        return pickle.loads(row[3])
+
+    def put(self, path: str, stat: os.stat_result, options: str, tags):
+        data = pickle.dumps(tags, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            row = self._db.execute('SELECT LENGTH(data) FROM tags WHERE path = ? AND options = ?',
+                                   (path, options)).fetchone()
+            if row is not None:
+                self._size -= row[0]
+            self._clock += 1
+            self._db.execute('INSERT OR REPLACE INTO tags VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (path, options, stat.st_size, stat.st_mtime_ns, stat.st_ino, data, self._clock))
+            self._size += len(data)
+            if self.max_size is not None and self._size > self.max_size:
+                self._evict()
+            self._db.commit()
+        return tags
+
+    def _evict(self) -> None:
+        rows = self._db.execute('SELECT rowid, LENGTH(data) FROM tags ORDER BY used')
+        evicted = []
+        for rowid, size in rows:
+            if self._size <= self.max_size:
+                break
+            evicted.append((rowid, ))
+            self._size -= size
+        self._db.executemany('DELETE FROM tags WHERE rowid = ?', evicted)
+        self.evictions += len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute('DELETE FROM tags')
+            self._db.commit()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM tags').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,21 +1,78 @@
 import re
 import struct
-from typing import BinaryIO, Dict, Any
+from array import array
+from collections.abc import Mapping
+from functools import lru_cache, partial
+from typing import BinaryIO, Callable, Dict, Any, Optional, Tuple
 
-from .exif_log import get_logger
+from .exif_log import get_logger, get_trace
+from .layout import signature
 from .utils import Ratio,dms_to_dd
 from .tags import EXIF_TAGS, DEFAULT_STOP_TAG, FIELD_TYPES, IGNORE_TAGS, makernote
-from .xmp import XMP
+from .tags.exif import GPS_TAGS, INTEROP_TAGS
 logger = get_logger()
 
+# struct format codes of integers by (length, signed)
+INT_FORMATS = {
+    (1, False): 'B',
+    (1, True):  'b',
+    (2, False): 'H',
+    (2, True):  'h',
+    (4, False): 'I',
+    (4, True):  'i',
+    (8, False): 'L',
+    (8, True):  'l',
+}
+
+# tag names of the IFDs searched for the tags selected by name only
+SEARCHED_NAMES = {
+    ifd_name: frozenset(entry[0] for entry in tag_dict.values())
+    for ifd_name, tag_dict in (('Image', EXIF_TAGS), ('EXIF', EXIF_TAGS), ('GPS', GPS_TAGS),
+                               ('Interoperability', INTEROP_TAGS))
+}
+
+# IFD name, and tag name if any, of a selected tag
+IFD_KEY = re.compile(r'(Image|Thumbnail|EXIF|GPS|Interoperability|MakerNote|IFD \d+)(?: (.+))?$')
+
+# selectable entries which are not tags of an IFD
+EXTRA_TAGS = ('XMP', 'JPEGThumbnail', 'TIFFThumbnail')
+
+# entries of an IFD from which its entry table is decoded with NumPy, when installed
+NUMPY_MIN_ENTRIES = 64
+
+# precompiled decoders for each byte order: integers by (length, signed),
+# floats by field type
+INT_STRUCTS = {
+    order: {key: struct.Struct(order + code) for key, code in INT_FORMATS.items()}
+    for order in '<>'
+}
+FLOAT_STRUCTS = {
+    order: {11: struct.Struct(order + 'f'), 12: struct.Struct(order + 'd')}
+    for order in '<>'
+}
+
+
+@lru_cache(maxsize=None)
+def _entries_decoder() -> Optional[Callable]:
+    """Return decode_entries() of ``ifd_numpy``, imported once, None when NumPy is not installed."""
+    try:
+        from .ifd_numpy import decode_entries  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return decode_entries
+
 
 class IfdTag:
     """
     Eases dealing with tags.
     """
 
+    __slots__ = ('_decode', '_printable', '_values', 'tag', 'field_type', 'field_offset', 'field_length')
+
     def __init__(self, printable: str, tag: int, field_type: int, values,
                  field_offset: int, field_length: int):
+        # callable returning (printable, values) for tags decoded on first access
+        self._decode = None  # type: Optional[Callable[[], tuple]]
         # printable version of data
         self.printable = printable
         # tag ID number
@@ -30,6 +87,55 @@ def __init__(self, printable: str, tag: int, field_type: int, values,
         # TODO: sort out this type mess!
         self.values = values
 
+    @classmethod
+    def lazy(cls, decode, tag: int, field_type: int, field_offset: int, field_length: int) -> 'IfdTag':
+        """
+        Create a tag whose printable and values are only computed on first
+        access, by calling ``decode()`` which returns them both.
+        """
+        ifd_tag = cls('', tag, field_type, None, field_offset, field_length)
+        ifd_tag._decode = decode
+        return ifd_tag
+
+    def _resolve(self) -> None:
+        decode = self._decode
+        if decode is not None:
+            self._printable, self._values = decode()
+            self._decode = None
+
+    def __getstate__(self) -> tuple:
+        # lazy tags are decoded first, their decoder cannot be pickled
+        return (self.printable, self.tag, self.field_type, self.values, self.field_offset, self.field_length)
+
+    def __setstate__(self, state: tuple) -> None:
+        self._decode = None
+        (self._printable, self.tag, self.field_type, self._values,
+         self.field_offset, self.field_length) = state
+
+    @property
+    def printable(self):
+        if self._decode is not None:
+            self._resolve()
+        return self._printable
+
+    @printable.setter
+    def printable(self, printable) -> None:
+        if self._decode is not None:
+            self._resolve()
+        self._printable = printable
+
+    @property
+    def values(self):
+        if self._decode is not None:
+            self._resolve()
+        return self._values
+
+    @values.setter
+    def values(self, values) -> None:
+        if self._decode is not None:
+            self._resolve()
+        self._values = values
+
     def __str__(self) -> str:
         return self.printable
 
@@ -51,23 +157,237 @@ def __repr__(self) -> str:
         return tag
 
 
+class TagsView(Mapping):
+    """
+    Read-only view of the tags found, by their usual 'IFD TagName' keys.
+
+    Tags are stored by (IFD name, tag name) tuples, which may also be used
+    as keys to look them up; entries without an IFD, like the thumbnails,
+    have an empty IFD name.
+    """
+
+    __slots__ = ('_tags', )
+
+    def __init__(self, tags: Dict[Tuple[str, str], Any]):
+        self._tags = tags
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self._tags[key]
+        # IFD names may contain spaces too ('IFD 2')
+        pos = key.find(' ')
+        while pos != -1:
+            tag_key = (key[:pos], key[pos + 1:])
+            if tag_key in self._tags:
+                return self._tags[tag_key]
+            pos = key.find(' ', pos + 1)
+        if ('', key) in self._tags:
+            return self._tags[('', key)]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for ifd_name, tag_name in self._tags:
+            yield ifd_name + ' ' + tag_name if ifd_name else tag_name
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def entries(self):
+        """Return the ((IFD name, tag name), tag) pairs."""
+        return self._tags.items()
+
+
+class TagSelection:
+    """
+    Tags to decode, the IFDs to walk for them and the tags left to find.
+
+    Each name is a tag name looked for in the main IFDs ('Orientation'),
+    an IFD and tag name as in the results ('GPS GPSLatitude'), an IFD name
+    for all its tags ('GPS', 'MakerNote'), or one of ``EXTRA_TAGS``.
+    """
+
+    def __init__(self, names):
+        self.ifds = set()  # type: set
+        self.keys = set()  # type: set
+        self.names = set()  # type: set
+        self.extras = set()  # type: set
+        for name in names:
+            match = IFD_KEY.match(name)
+            if name in EXTRA_TAGS:
+                self.extras.add(name)
+            elif match is None:
+                self.names.add(name)
+            elif match.group(2) is None:
+                self.ifds.add(name)
+            else:
+                self.keys.add(match.groups())
+        self.key = frozenset(names)
+        # what the results are made of, the sets above keep the tags left to find
+        self.requested = frozenset(self.ifds), frozenset(self.keys), frozenset(self.names)
+
+        # IFDs decoded whole, makernotes refer to their own tags
+        self.whole = set(self.ifds)
+        if 'JPEGThumbnail' in self.extras or 'TIFFThumbnail' in self.extras:
+            self.whole.add('Thumbnail')
+        if any(ifd_name == 'MakerNote' for ifd_name, _ in self.keys):
+            self.whole.add('MakerNote')
+        self.unwalked = set(self.whole)
+
+        # IFDs to walk, and the tags pointing to them
+        self.walks = self.whole | {ifd_name for ifd_name, _ in self.keys}
+        self.walks.update(ifd_name for ifd_name, names in SEARCHED_NAMES.items() if names & self.names)
+        self.helpers = set()  # type: set
+        if 'MakerNote' in self.walks:
+            self.walks.add('EXIF')
+            self.helpers.update((('Image', 'Make'), ('Image', 'Model'), ('EXIF', 'MakerNote')))
+        if 'Interoperability' in self.walks:
+            self.walks.add('EXIF')
+            self.helpers.add(('EXIF', 'InteroperabilityOffset'))
+        if 'GPS' in self.walks:
+            self.walks.add('Image')
+            self.helpers.add(('Image', 'GPSInfo'))
+        if 'EXIF' in self.walks:
+            self.walks.add('Image')
+            self.helpers.add(('Image', 'ExifOffset'))
+
+    def complete(self) -> bool:
+        """Tell whether all the selected tags are found."""
+        return not (self.keys or self.names or self.unwalked)
+
+    def visits(self, ifd_name: str) -> bool:
+        """Tell whether an IFD holds selected tags left to find, or points to some."""
+        return ifd_name in self.walks and not self.complete()
+
+    def wants(self, ifd_name: str, tag_name: str) -> bool:
+        """Tell whether a tag of an IFD has to be decoded."""
+        key = (ifd_name, tag_name)
+        return (ifd_name in self.whole or key in self.keys or key in self.helpers
+                or (tag_name in self.names and ifd_name in SEARCHED_NAMES))
+
+    def found(self, ifd_name: str, tag_name: str) -> bool:
+        """Record a decoded tag, return True when all the selected tags are found."""
+        self.keys.discard((ifd_name, tag_name))
+        if ifd_name in SEARCHED_NAMES:
+            self.names.discard(tag_name)
+        return self.complete()
+
+    def walked(self, ifd_name: str) -> None:
+        self.unwalked.discard(ifd_name)
+
+    def remaining(self) -> tuple:
+        """Return the tags left to find, which decide the entries of an IFD to decode."""
+        return frozenset(self.keys), frozenset(self.names)
+
+    def selected(self, key: Tuple[str, str]) -> bool:
+        """Tell whether a tag is part of the results, it may only point to selected ones."""
+        ifd_name, tag_name = key
+        ifds, keys, names = self.requested
+        return (ifd_name in ifds or key in keys
+                or (tag_name in names and ifd_name in SEARCHED_NAMES)
+                or (not ifd_name and tag_name in self.extras))
+
+
+class TagIndex:
+    """
+    Table of the entries of the IFDs of a file, without their values.
+
+    Each row is the IFD, tag ID, field type, count and value offset of an
+    entry, the offset being absolute (from the start of the file) whether
+    the value is inline or not. The columns are arrays, ``ifds`` lists the
+    (IFD name, absolute offset, endian, tag dict) of the IFDs walked.
+    """
+
+    __slots__ = ('ifds', 'ifd_ids', 'tags', 'field_types', 'counts', 'value_offsets')
+
+    def __init__(self):
+        self.ifds = []  # type: list
+        self.ifd_ids = array('H')
+        self.tags = array('H')
+        self.field_types = array('H')
+        self.counts = array('I')
+        self.value_offsets = array('Q')
+
+    def add_ifd(self, ifd_name: str, offset: int, endian: str, tag_dict: dict) -> int:
+        self.ifds.append((ifd_name, offset, endian, tag_dict))
+        return len(self.ifds) - 1
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def __getitem__(self, row: int) -> tuple:
+        """Return an entry as an (IFD name, tag ID, field type, count, value offset) tuple."""
+        return (self.ifds[self.ifd_ids[row]][0], self.tags[row], self.field_types[row],
+                self.counts[row], self.value_offsets[row])
+
+    def __iter__(self):
+        for row in range(len(self.tags)):
+            yield self[row]
+
+    def find(self, ifd_name: str, tag: int):
+        """Return the first entry of a tag in an IFD, None when there is none."""
+        ids = [ifd_id for ifd_id, ifd in enumerate(self.ifds) if ifd[0] == ifd_name]
+        for row, tag_id in enumerate(self.tags):
+            if tag_id == tag and self.ifd_ids[row] in ids:
+                return self[row]
+        return None
+
+    def keys(self) -> list:
+        """Return the 'IFD TagName' keys of the entries, as in the tags found by ``process_file()``."""
+        keys = []
+        for ifd_id, tag in zip(self.ifd_ids, self.tags):
+            ifd_name, _, _, tag_dict = self.ifds[ifd_id]
+            tag_entry = tag_dict.get(tag)
+            keys.append(ifd_name + ' ' + (tag_entry[0] if tag_entry else 'Tag 0x%04X' % tag))
+        return keys
+
+
 class ExifHeader:
     """
     Handle an EXIF header.
     """
 
-    def __init__(self, file_handle: BinaryIO, endian, offset, fake_exif, strict: bool,
-                 debug=False, detailed=True, truncate_tags=True):
+    def __init__(self, file_handle: Optional[BinaryIO], endian, offset, fake_exif, strict: bool,
+                 debug=False, detailed=True, truncate_tags=True, data=None, data_offset=0,
+                 lazy=False, selection=None, layout_cache=None):
         self.file_handle = file_handle
         self.endian = endian
         self.offset = offset
+        # optional in-memory copy of the EXIF segment (bytes, bytearray,
+        # memoryview...) and its absolute position in the file
+        self.data = data
+        self.data_offset = data_offset
+        # decode values only when first accessed, needs the data in memory
+        self.lazy = lazy
+        # TagSelection of the tags to decode, None for all
+        self.selection = selection
+        # LayoutCache of the entries processed by IFD layout, None to walk every IFD
+        self.layout_cache = layout_cache
+        # debug logging function, None when debug output is disabled
+        self.trace = get_trace()
         self.fake_exif = fake_exif
         self.strict = strict
         self.debug = debug
         self.detailed = detailed
         self.truncate_tags = truncate_tags
         # TODO: get rid of 'Any' type
-        self.tags = {}  # type: Dict[str, Any]
+        self._tags = {}  # type: Dict[Tuple[str, str], Any]
+        self.tags = TagsView(self._tags)
+
+    @property
+    def endian(self) -> str:
+        """Byte order, 'I' (Intel) for little-endian or 'M' (Motorola) for big-endian."""
+        return self._endian
+
+    @endian.setter
+    def endian(self, endian: str) -> None:
+        # select the decoders once, not on every conversion
+        self._endian = endian
+        self._order = '<' if endian == 'I' else '>'
+        self._int_structs = INT_STRUCTS[self._order]
+        self._float_structs = FLOAT_STRUCTS[self._order]
 
     def s2n(self, offset, length: int, signed=False) -> int:
         """
@@ -78,33 +398,64 @@ def s2n(self, offset, length: int, signed=False) -> int:
         For some cameras that use relative tags, this offset may be relative
         to some other starting point.
         """
-        # Little-endian if Intel, big-endian if Motorola
-        fmt = '<' if self.endian == 'I' else '>'
-        # Construct a format string from the requested length and signedness;
-        # raise a ValueError if length is something silly like 3
+        # Pick the decoder for the requested length and signedness, in the
+        # current byte order; raise a ValueError if length is something silly like 3
         try:
-            fmt += {
-                (1, False): 'B',
-                (1, True):  'b',
-                (2, False): 'H',
-                (2, True):  'h',
-                (4, False): 'I',
-                (4, True):  'i',
-                (8, False): 'L',
-                (8, True):  'l',
-                }[(length, signed)]
+            decoder = self._int_structs[(length, signed)]
         except KeyError as err:
             raise ValueError('unexpected unpacking length: %d' % length) from err
-        self.file_handle.seek(self.offset + offset)
-        buf = self.file_handle.read(length)
+        if self.data is not None:
+            start = self.offset + offset - self.data_offset
+            if 0 <= start <= len(self.data) - length:
+                return decoder.unpack_from(self.data, start)[0]
+        buf = self.read(offset, length)
 
         if buf:
             # https://github.com/ianare/exif-py/pull/158
             # had to revert as this certain fields to be empty
             # please provide test images
-            return struct.unpack(fmt, buf)[0]
+            return decoder.unpack(buf)[0]
         return 0
 
+    def unpack(self, offset, count: int, code: str, length: int):
+        """
+        Convert a slice of ``count`` values of ``length`` bytes each at once,
+        ``code`` being their struct format code.
+
+        Return None if the slice is truncated.
+        """
+        fmt = self._order + str(count) + code
+        size = count * length
+        if self.data is not None:
+            start = self.offset + offset - self.data_offset
+            if 0 <= start <= len(self.data) - size:
+                return list(struct.unpack_from(fmt, self.data, start))
+        buf = self.read(offset, size)
+        if len(buf) != size:
+            return None
+        return list(struct.unpack(fmt, buf))
+
+    def read(self, offset, length: int) -> bytes:
+        """
+        Read bytes, offset is relative to the beginning of the EXIF information.
+
+        Served from the in-memory segment when it covers the requested range,
+        otherwise from the file handle. Without a file handle the data is
+        the whole file, reads past its end come back short like a file's.
+        """
+        if self.data is not None:
+            start = self.offset + offset - self.data_offset
+            if 0 <= start and start + length <= len(self.data):
+                return bytes(self.data[start:start + length])
+            if self.file_handle is None:
+                if start < 0:
+                    raise ValueError('negative seek value %d' % start)
+                return bytes(self.data[start:start + length])
+        if self.file_handle is None:
+            raise ValueError('no Exif data nor file handle to read from')
+        self.file_handle.seek(self.offset + offset)
+        return self.file_handle.read(length)
+
     def n2b(self, offset, length) -> bytes:
         """Convert offset to bytes."""
         s = b''
@@ -142,6 +493,40 @@ def list_ifd(self) -> list:
             i = self._next_ifd(i)
         return ifds
 
+    def read_tag(self, ifd, tag: int) -> bytes:
+        """Return the raw data of a tag of an IFD, b'' when it is not there."""
+        for i in range(self.s2n(ifd, 2)):
+            entry = ifd + 2 + 12 * i
+            if self.s2n(entry, 2) != tag:
+                continue
+            field_type = self.s2n(entry + 2, 2)
+            if not 0 < field_type < len(FIELD_TYPES):
+                return b''
+            length = self.s2n(entry + 4, 4) * FIELD_TYPES[field_type][0]
+            offset = entry + 8 if length <= 4 else self.s2n(entry + 8, 4)
+            return self.read(offset, length)
+        return b''
+
+    def _unpack_field(self, count, field_type, type_length, offset, signed):
+        """
+        Convert all the values of a field with a single unpack.
+
+        Return None if the field data is truncated.
+        """
+        if field_type in (5, 10):
+            # ratios, as numerator and denominator pairs
+            ints = self.unpack(offset, 2 * count, INT_FORMATS[(4, signed)], 4)
+            if ints is None:
+                return None
+            return [Ratio(num, den) for num, den in zip(ints[0::2], ints[1::2])]
+        if field_type in (11, 12):
+            # floats or doubles, kept as the 1-tuples given by struct.unpack()
+            floats = self.unpack(offset, count, 'f' if field_type == 11 else 'd', type_length)
+            if floats is None:
+                return None
+            return [(value, ) for value in floats]
+        return self.unpack(offset, count, INT_FORMATS[(type_length, signed)], type_length)
+
     def _process_field(self, tag_name, count, field_type, type_length, offset):
         values = []
         signed = (field_type in [6, 8, 9, 10])
@@ -149,43 +534,44 @@ def _process_field(self, tag_name, count, field_type, type_length, offset):
         # some entries get too big to handle could be malformed
         # file or problem with self.s2n
         if count < 1000:
-            for _ in range(count):
-                if field_type in (5, 10):
-                    # a ratio
-                    value = Ratio(
-                        self.s2n(offset, 4, signed),
-                        self.s2n(offset + 4, 4, signed)
-                    )
-                elif field_type in (11, 12):
-                    # a float or double
-                    unpack_format = ''
-                    if self.endian == 'I':
-                        unpack_format += '<'
-                    else:
-                        unpack_format += '>'
-                    if field_type == 11:
-                        unpack_format += 'f'
+            # convert the whole array at once, value by value only if truncated
+            unpacked = self._unpack_field(count, field_type, type_length, offset, signed)
+            if unpacked is not None:
+                values = unpacked
+            else:
+                for _ in range(count):
+                    if field_type in (5, 10):
+                        # a ratio
+                        value = Ratio(
+                            self.s2n(offset, 4, signed),
+                            self.s2n(offset + 4, 4, signed)
+                        )
+                    elif field_type in (11, 12):
+                        # a float or double
+                        byte_str = self.read(offset, type_length)
+                        try:
+                            value = self._float_structs[field_type].unpack(byte_str)
+                        except struct.error:
+                            logger.warning('Possibly corrupted field %s', tag_name)
+                            # -1 means corrupted
+                            value = -1
                     else:
-                        unpack_format += 'd'
-                    self.file_handle.seek(self.offset + offset)
-                    byte_str = self.file_handle.read(type_length)
-                    try:
-                        value = struct.unpack(unpack_format, byte_str)
-                    except struct.error:
-                        logger.warning('Possibly corrupted field %s', tag_name)
-                        # -1 means corrupted
-                        value = -1
-                else:
-                    value = self.s2n(offset, type_length, signed)
-                values.append(value)
-                offset = offset + type_length
+                        value = self.s2n(offset, type_length, signed)
+                    values.append(value)
+                    offset = offset + type_length
         # The test above causes problems with tags that are
         # supposed to have long values! Fix up one important case.
-        elif tag_name in ('MakerNote', makernote.canon.CAMERA_INFO_TAG_NAME):
-            for _ in range(count):
-                value = self.s2n(offset, type_length, signed)
-                values.append(value)
-                offset = offset + type_length
+        elif tag_name in ('MakerNote', makernote.load('canon').CAMERA_INFO_TAG_NAME):
+            unpacked = None
+            if type_length != 8:
+                unpacked = self.unpack(offset, count, INT_FORMATS[(type_length, signed)], type_length)
+            if unpacked is not None:
+                values = unpacked
+            else:
+                for _ in range(count):
+                    value = self.s2n(offset, type_length, signed)
+                    values.append(value)
+                    offset = offset + type_length
         if len(values) == 1:
             return values[0]
         else:
@@ -199,8 +585,7 @@ def _process_field2(self, ifd_name, tag_name, count, offset):
         if count != 0:  # and count < (2**31):  # 2E31 is hardware dependent. --gd
             file_position = self.offset + offset
             try:
-                self.file_handle.seek(file_position)
-                values = self.file_handle.read(count)
+                values = self.read(offset, count)
 
                 # Drop any garbage after a null.
                 values = values.split(b'\x00', 1)[0]
@@ -226,8 +611,13 @@ def _process_tag(self, ifd, ifd_name: str, tag_entry, entry, tag: int, tag_name,
                 return
             raise ValueError('Unknown type %d in tag 0x%04X' % (field_type, tag))
 
-        type_length = FIELD_TYPES[field_type][0]
         count = self.s2n(entry + 4, 4)
+        self._process_entry(ifd, ifd_name, tag_entry, entry, tag, tag_name, relative, stop_tag,
+                            field_type, count)
+
+    def _process_entry(self, ifd, ifd_name: str, tag_entry, entry, tag: int, tag_name, relative, stop_tag,
+                       field_type: int, count: int) -> None:
+        type_length = FIELD_TYPES[field_type][0]
         # Adjust for tag id/type/count (2+2+4 bytes)
         # Now we point at either the data or the 2nd level offset
         offset = entry + 8
@@ -249,54 +639,80 @@ def _process_tag(self, ifd, ifd_name: str, tag_entry, entry, tag: int, tag_name,
             else:
                 offset = self.s2n(offset, 4)
 
+        self._store_tag(ifd_name, tag_entry, tag, tag_name, stop_tag, field_type, count, offset)
+
+    def _store_tag(self, ifd_name: str, tag_entry, tag: int, tag_name, stop_tag, field_type: int, count: int,
+                   offset, values=None) -> None:
+        """Decode the values of an entry at ``offset``, unless given, and store its tag."""
         field_offset = offset
-        values = None
-        if field_type == 2:
-            values = self._process_field2(ifd_name, tag_name, count, offset)
+        field_length = count * FIELD_TYPES[field_type][0]
+        subifd = tag_entry and len(tag_entry) != 1 and isinstance(tag_entry[1], tuple)
+        if self.lazy and not subifd:
+            # keep the header state the field was found with, it may change
+            # while processing makernotes
+            decode = partial(self._decode_field, self.offset, self.endian,
+                             ifd_name, tag_name, tag_entry, field_type, count, offset)
+            ifd_tag = IfdTag.lazy(decode, tag, field_type, field_offset, field_length)
         else:
-            values = self._process_field(tag_name, count, field_type, type_length, offset)
-        # now 'values' is either a string, int/float, or array 
-        # TODO: use only one type
+            if values is None:
+                values = self._process_values(ifd_name, tag_name, field_type, count, offset)
+            printable = self._make_printable(tag_entry, field_type, count, values)
+            if subifd:
+                ifd_info = tag_entry[1]
+                try:
+                    if self.trace:
+                        self.trace('%s SubIFD at offset %d:', ifd_info[0], values)
+                    self.dump_ifd(values, ifd_info[0], tag_dict=ifd_info[1], stop_tag=stop_tag)
+                except IndexError:
+                    logger.warning('No values found for %s SubIFD', ifd_info[0])
+            ifd_tag = IfdTag(printable, tag, field_type, values, field_offset, field_length)
+
+        self._tags[(ifd_name, tag_name)] = ifd_tag
+        if self.trace:
+            self.trace(' %s: %s', tag_name, repr(ifd_tag))
+
+    def _process_values(self, ifd_name, tag_name, field_type, count, offset):
+        """Return the values of a field: a string, int/float, or array."""
+        if field_type == 2:
+            return self._process_field2(ifd_name, tag_name, count, offset)
+        return self._process_field(tag_name, count, field_type, FIELD_TYPES[field_type][0], offset)
+
+    def _make_printable(self, tag_entry, field_type, count, values):
+        """Compute the printable version of the values of a field."""
+        # TODO: use only one type for values
         if count == 1 and field_type != 2:
-            # printable = str(values)
             printable = values
         elif count > 50 and len(values) > 20 and not isinstance(values, str):
             if self.truncate_tags:
                 printable = str(values[0:20])[0:-1] + ', ... ]'
             else:
-                printable = str(values[0:-1])
                 printable = values[0:-1]
         else:
-            printable = str(values)
             printable = values
-        # compute printable version of values
-        if tag_entry:
-            # optional 2nd tag element is present
-            if len(tag_entry) != 1:
-                if callable(tag_entry[1]):
-                    # call mapping function
-                    printable = tag_entry[1](values)
-                elif isinstance(tag_entry[1], tuple):
-                    ifd_info = tag_entry[1]
-                    try:
-                        logger.debug('%s SubIFD at offset %d:', ifd_info[0], values)
-                        self.dump_ifd(values, ifd_info[0], tag_dict=ifd_info[1], stop_tag=stop_tag)
-                    except IndexError:
-                        logger.warning('No values found for %s SubIFD', ifd_info[0])
-                else:
-                    try:
-                        printable = ''
-                        for val in values:
-                            # use lookup table for this tag
-                            printable += tag_entry[1].get(val, repr(val))
-                    except:
-                        printable = tag_entry[1].get(values, repr(values))
-
-        self.tags[ifd_name + ' ' + tag_name] = IfdTag(
-            printable, tag, field_type, values, field_offset, count * type_length
-        )
-        tag_value = repr(self.tags[ifd_name + ' ' + tag_name])
-        logger.debug(' %s: %s', tag_name, tag_value)
+        # optional 2nd tag element is present
+        if tag_entry and len(tag_entry) != 1:
+            if callable(tag_entry[1]):
+                # call mapping function
+                printable = tag_entry[1](values)
+            elif not isinstance(tag_entry[1], tuple):
+                try:
+                    printable = ''
+                    for val in values:
+                        # use lookup table for this tag
+                        printable += tag_entry[1].get(val, repr(val))
+                except:
+                    printable = tag_entry[1].get(values, repr(values))
+        return printable
+
+    def _decode_field(self, offset, endian, ifd_name, tag_name, tag_entry, field_type, count, field_offset):
+        """Decode the field of a lazy tag, return its printable and values."""
+        state = self.offset, self.endian
+        self.offset, self.endian = offset, endian
+        try:
+            values = self._process_values(ifd_name, tag_name, field_type, count, field_offset)
+        finally:
+            self.offset, self.endian = state
+        return self._make_printable(tag_entry, field_type, count, values), values
 
     def dump_ifd(self, ifd, ifd_name: str, tag_dict=None, relative=0, stop_tag=DEFAULT_STOP_TAG) -> None:
         """
@@ -311,10 +727,31 @@ def dump_ifd(self, ifd, ifd_name: str, tag_dict=None, relative=0, stop_tag=DEFAU
             logger.warning('Possibly corrupted IFD: %s', ifd)
             return
 
+        processed = None  # type: Optional[list]
+        # the entry table, only read for the layout cache and NumPy
+        table = b''
+        if self.layout_cache is not None or entries >= NUMPY_MIN_ENTRIES:
+            table = self.read(ifd + 2, 12 * entries)
+        if self.layout_cache is not None:
+            # the entries decoded depend on the tags still to find, not only on the selection
+            selected = None if self.selection is None else (self.selection.key, self.selection.remaining())
+            layout_key = (ifd_name, self.endian, id(tag_dict), stop_tag, self.detailed, selected,
+                          signature(table))
+            layout = self.layout_cache.get(layout_key)
+            if layout is not None:
+                self._replay_ifd(ifd, ifd_name, layout, relative, stop_tag)
+                return
+            # a truncated table is walked as far as it goes, but not kept
+            processed = [] if len(table) == 12 * entries else None
+
+        decoded = None
+        if entries >= NUMPY_MIN_ENTRIES and len(table) == 12 * entries:
+            decoded = self._decode_table(table, ifd, relative)
+
         for i in range(entries):
             # entry is index of start of this IFD in the file
             entry = ifd + 2 + 12 * i
-            tag = self.s2n(entry, 2)
+            tag = decoded[0][i] if decoded else self.s2n(entry, 2)
 
             # get tag name early to avoid errors, help debug
             tag_entry = tag_dict.get(tag)
@@ -325,11 +762,140 @@ def dump_ifd(self, ifd, ifd_name: str, tag_dict=None, relative=0, stop_tag=DEFAU
 
             # ignore certain tags for faster processing
             if not (not self.detailed and tag in IGNORE_TAGS):
-                self._process_tag(ifd, ifd_name, tag_entry, entry, tag, tag_name, relative, stop_tag)
+                if self.selection is None or self.selection.wants(ifd_name, tag_name):
+                    if processed is not None:
+                        processed.append((i, tag, tag_name, tag_entry)
+                                         + struct.unpack_from(self._order + 'HI', table, 12 * i + 2))
+                    if decoded:
+                        self._process_decoded(decoded, i, ifd_name, tag_entry, tag, tag_name, stop_tag)
+                    else:
+                        self._process_tag(ifd, ifd_name, tag_entry, entry, tag, tag_name, relative, stop_tag)
+                    if self.selection is not None and self.selection.found(ifd_name, tag_name):
+                        # the entries left were not looked at, the layout is not kept
+                        processed = None
+                        break
 
             if tag_name == stop_tag:
                 break
 
+        if processed is not None:
+            self.layout_cache.put(layout_key, tuple(processed))
+        if self.selection is not None:
+            self.selection.walked(ifd_name)
+
+    def _decode_table(self, table: bytes, ifd, relative):
+        """Decode an IFD entry table with NumPy, see ``ifd_numpy``. None when NumPy is not installed."""
+        decode_entries = _entries_decoder()
+        if decode_entries is None:
+            return None
+        return decode_entries(table, self.endian, ifd, relative, self.fake_exif)
+
+    def _process_decoded(self, decoded: tuple, i: int, ifd_name: str, tag_entry, tag: int, tag_name,
+                         stop_tag) -> None:
+        _, field_types, counts, offsets, values = decoded
+        field_type = field_types[i]
+        # unknown field type
+        if not 0 < field_type < len(FIELD_TYPES):
+            if not self.strict:
+                return
+            raise ValueError('Unknown type %d in tag 0x%04X' % (field_type, tag))
+        self._store_tag(ifd_name, tag_entry, tag, tag_name, stop_tag, field_type, counts[i], offsets[i],
+                        values[i])
+
+    def _replay_ifd(self, ifd, ifd_name: str, layout: tuple, relative, stop_tag) -> None:
+        """Process the entries of an IFD found in the same layout, without reading the others."""
+        for i, tag, tag_name, tag_entry, field_type, count in layout:
+            entry = ifd + 2 + 12 * i
+            if 0 < field_type < len(FIELD_TYPES):
+                self._process_entry(ifd, ifd_name, tag_entry, entry, tag, tag_name, relative, stop_tag,
+                                    field_type, count)
+            else:
+                self._process_tag(ifd, ifd_name, tag_entry, entry, tag, tag_name, relative, stop_tag)
+            if self.selection is not None:
+                self.selection.found(ifd_name, tag_name)
+        if self.selection is not None:
+            self.selection.walked(ifd_name)
+
+    def index(self, ifd_names=None) -> TagIndex:
+        """
+        Map the entries of the IFDs, of the EXIF, GPS and Interoperability
+        sub-IFDs and of the makernote IFD of known formats, without decoding
+        their values.
+
+        ``ifd_names`` restricts the IFDs mapped, along with those pointing
+        to them (the first IFD, EXIF).
+        """
+        def wanted(*names):
+            return ifd_names is None or any(name in ifd_names for name in names)
+
+        table = TagIndex()
+        for ctr, ifd in enumerate(self.list_ifd()):
+            if ctr == 0:
+                ifd_name = 'Image'
+            elif ctr == 1:
+                ifd_name = 'Thumbnail'
+            else:
+                ifd_name = 'IFD %d' % ctr
+            if ctr == 0 or wanted(ifd_name):
+                self._index_ifd(table, ifd, ifd_name, EXIF_TAGS)
+        if wanted('EXIF', 'Interoperability', 'MakerNote'):
+            self._index_sub_ifd(table, 'Image', 0x8769, 'EXIF', EXIF_TAGS)
+        if wanted('GPS'):
+            self._index_sub_ifd(table, 'Image', 0x8825, 'GPS', GPS_TAGS)
+        if wanted('Interoperability'):
+            self._index_sub_ifd(table, 'EXIF', 0xA005, 'Interoperability', INTEROP_TAGS)
+
+        note = table.find('EXIF', 0x927C) if wanted('MakerNote') else None
+        make = table.find('Image', 0x010F)
+        if note and make:
+            make = self.read(make[4] - self.offset, make[3]).split(b'\x00', 1)[0]
+            note_offset = note[4] - self.offset
+            located = self._locate_maker_note(make.decode('utf-8', 'replace'), note_offset,
+                                              list(self.read(note_offset, 14)))
+            if located:
+                ifd, tag_dict, relative, offset, endian = located
+                state = self.offset, self.endian
+                self.offset, self.endian = offset, endian
+                try:
+                    self._index_ifd(table, ifd, 'MakerNote', tag_dict, relative)
+                finally:
+                    self.offset, self.endian = state
+        return table
+
+    def _index_ifd(self, table: TagIndex, ifd: int, ifd_name: str, tag_dict: dict, relative=0) -> None:
+        entries = self.s2n(ifd, 2)
+        data = self.read(ifd + 2, 12 * entries)
+        ifd_id = table.add_ifd(ifd_name, self.offset + ifd, self.endian, tag_dict)
+        entry = ifd + 2
+        for tag, field_type, count, value in struct.iter_unpack(self._order + 'HHII',
+                                                                data[:len(data) - len(data) % 12]):
+            if 0 < field_type < len(FIELD_TYPES) and count * FIELD_TYPES[field_type][0] > 4:
+                # a pointer to the value, see _process_tag()
+                offset = value
+                if relative:
+                    offset = value + ifd - 8
+                    if self.fake_exif:
+                        offset += 18
+            else:
+                offset = entry + 8
+            table.ifd_ids.append(ifd_id)
+            table.tags.append(tag)
+            table.field_types.append(field_type)
+            table.counts.append(count)
+            table.value_offsets.append(self.offset + offset)
+            entry += 12
+
+    def _index_sub_ifd(self, table: TagIndex, parent: str, tag: int, ifd_name: str, tag_dict: dict) -> None:
+        entry = table.find(parent, tag)
+        if entry and 0 < entry[2] < len(FIELD_TYPES):
+            ifd = self.s2n(entry[4] - self.offset, FIELD_TYPES[entry[2]][0])
+            self._index_ifd(table, ifd, ifd_name, tag_dict)
+
+    def drop_unselected(self) -> None:
+        """Remove the tags only decoded to reach the selected ones."""
+        for key in [key for key in self._tags if not self.selection.selected(key)]:
+            del self._tags[key]
+
     def extract_tiff_thumbnail(self, thumb_ifd: int) -> None:
         """
         Extract uncompressed TIFF thumbnail.
@@ -337,7 +903,7 @@ def extract_tiff_thumbnail(self, thumb_ifd: int) -> None:
         Take advantage of the pre-existing layout in the thumbnail IFD as
         much as possible
         """
-        thumb = self.tags.get('Thumbnail Compression')
+        thumb = self._tags.get(('Thumbnail', 'Compression'))
         if not thumb or thumb.printable != 'Uncompressed TIFF':
             return
 
@@ -348,8 +914,7 @@ def extract_tiff_thumbnail(self, thumb_ifd: int) -> None:
         else:
             tiff = b'II*\x00\x08\x00\x00\x00'
             # ... plus thumbnail IFD data plus a null "next IFD" pointer
-        self.file_handle.seek(self.offset + thumb_ifd)
-        tiff += self.file_handle.read(entries * 12 + 2) + b'\x00\x00\x00\x00'
+        tiff += self.read(thumb_ifd, entries * 12 + 2) + b'\x00\x00\x00\x00'
 
         # fix up large value offset pointers into data area
         for i in range(entries):
@@ -376,22 +941,20 @@ def extract_tiff_thumbnail(self, thumb_ifd: int) -> None:
                     strip_off = newoff
                     strip_len = 4
                 # get original data and store it
-                self.file_handle.seek(self.offset + old_offset)
-                tiff += self.file_handle.read(count * type_length)
+                tiff += self.read(old_offset, count * type_length)
 
         # add pixel strips and update strip offset info
-        old_offsets = self.tags['Thumbnail StripOffsets'].values
-        old_counts = self.tags['Thumbnail StripByteCounts'].values
+        old_offsets = self._tags[('Thumbnail', 'StripOffsets')].values
+        old_counts = self._tags[('Thumbnail', 'StripByteCounts')].values
         for i, old_offset in enumerate(old_offsets):
             # update offset pointer (more nasty "strings are immutable" crap)
             offset = self.n2b(len(tiff), strip_len)
             tiff = tiff[:strip_off] + offset + tiff[strip_off + strip_len:]
             strip_off += strip_len
             # add pixel strip to end
-            self.file_handle.seek(self.offset + old_offset)
-            tiff += self.file_handle.read(old_counts[i])
+            tiff += self.read(old_offset, old_counts[i])
 
-        self.tags['TIFFThumbnail'] = tiff
+        self._tags[('', 'TIFFThumbnail')] = tiff
 
     def extract_jpeg_thumbnail(self) -> None:
         """
@@ -399,19 +962,18 @@ def extract_jpeg_thumbnail(self) -> None:
 
         (Thankfully the JPEG data is stored as a unit.)
         """
-        thumb_offset = self.tags.get('Thumbnail JPEGInterchangeFormat')
+        thumb_offset = self._tags.get(('Thumbnail', 'JPEGInterchangeFormat'))
         if thumb_offset:
-            self.file_handle.seek(self.offset + thumb_offset.values[0])
-            size = self.tags['Thumbnail JPEGInterchangeFormatLength'].values[0]
-            self.tags['JPEGThumbnail'] = self.file_handle.read(size)
+            thumb_start = thumb_offset.values[0]
+            size = self._tags[('Thumbnail', 'JPEGInterchangeFormatLength')].values[0]
+            self._tags[('', 'JPEGThumbnail')] = self.read(thumb_start, size)
 
         # Sometimes in a TIFF file, a JPEG thumbnail is hidden in the MakerNote
         # since it's not allowed in a uncompressed TIFF IFD
-        if 'JPEGThumbnail' not in self.tags:
-            thumb_offset = self.tags.get('MakerNote JPEGThumbnail')
+        if ('', 'JPEGThumbnail') not in self._tags:
+            thumb_offset = self._tags.get(('MakerNote', 'JPEGThumbnail'))
             if thumb_offset:
-                self.file_handle.seek(self.offset + thumb_offset.values[0])
-                self.tags['JPEGThumbnail'] = self.file_handle.read(thumb_offset.field_length)
+                self._tags[('', 'JPEGThumbnail')] = self.read(thumb_offset.values[0], thumb_offset.field_length)
 
     def decode_maker_note(self) -> None:
         """
@@ -437,101 +999,100 @@ def decode_maker_note(self) -> None:
 
         TODO: look into splitting this up
         """
-        note = self.tags['EXIF MakerNote']
+        note = self._tags[('EXIF', 'MakerNote')]
 
         # Some apps use MakerNote tags but do not use a format for which we
         # have a description, so just do a raw dump for these.
-        make = self.tags['Image Make'].printable
+        make = self._tags[('Image', 'Make')].printable
+
+        located = self._locate_maker_note(make, note.field_offset, note.values)
+        if located is None:
+            return
+        ifd, tag_dict, relative, offset, endian = located
+        state = self.offset, self.endian
+        self.offset, self.endian = offset, endian
+        self.dump_ifd(ifd, 'MakerNote', tag_dict=tag_dict, relative=relative)
+        # reset to correct values
+        self.offset, self.endian = state
+
+        # Canon
+        if make == 'Canon':
+            canon = makernote.load('canon')
+            for i in ((('MakerNote', 'Tag 0x0001'), canon.CAMERA_SETTINGS),
+                      (('MakerNote', 'Tag 0x0002'), canon.FOCAL_LENGTH),
+                      (('MakerNote', 'Tag 0x0004'), canon.SHOT_INFO),
+                      (('MakerNote', 'Tag 0x0026'), canon.AF_INFO_2),
+                      (('MakerNote', 'Tag 0x0093'), canon.FILE_INFO)):
+                if i[0] in self._tags:
+                    logger.debug('Canon %s %s', *i[0])
+                    self._canon_decode_tag(self._tags[i[0]].values, i[1])
+                    del self._tags[i[0]]
+            camera_info_key = tuple(canon.CAMERA_INFO_TAG_NAME.split(' ', 1))
+            if camera_info_key in self._tags:
+                tag = self._tags[camera_info_key]
+                logger.debug('Canon CameraInfo')
+                self._canon_decode_camera_info(tag)
+                del self._tags[camera_info_key]
+
+    def _locate_maker_note(self, make: str, note_offset: int, note_values):
+        """
+        Return where the IFD of a MakerNote of known format is, as (IFD
+        offset, tag dict, relative, header offset, endian) with the header
+        offset and endian it is read with. None for unknown formats.
 
+        ``note_values`` are the values of the MakerNote, at least its first 14 bytes.
+        """
         # Nikon
         # The maker note usually starts with the word Nikon, followed by the
         # type of the makernote (1 or 2, as a short).  If the word Nikon is
         # not at the start of the makernote, it's probably type 2, since some
         # cameras work that way.
         if 'NIKON' in make:
-            if note.values[0:7] == [78, 105, 107, 111, 110, 0, 1]:
+            if note_values[0:7] == [78, 105, 107, 111, 110, 0, 1]:
                 logger.debug('Looks like a type 1 Nikon MakerNote.')
-                self.dump_ifd(note.field_offset + 8, 'MakerNote',
-                              tag_dict=makernote.nikon.TAGS_OLD)
-            elif note.values[0:7] == [78, 105, 107, 111, 110, 0, 2]:
+                return note_offset + 8, makernote.load('nikon').TAGS_OLD, 0, self.offset, self.endian
+            if note_values[0:7] == [78, 105, 107, 111, 110, 0, 2]:
                 logger.debug('Looks like a labeled type 2 Nikon MakerNote')
-                if note.values[12:14] != [0, 42] and note.values[12:14] != [42, 0]:
+                if note_values[12:14] != [0, 42] and note_values[12:14] != [42, 0]:
                     raise ValueError('Missing marker tag 42 in MakerNote.')
                     # skip the Makernote label and the TIFF header
-                self.dump_ifd(note.field_offset + 10 + 8, 'MakerNote',
-                              tag_dict=makernote.nikon.TAGS_NEW, relative=1)
-            else:
-                # E99x or D1
-                logger.debug('Looks like an unlabeled type 2 Nikon MakerNote')
-                self.dump_ifd(note.field_offset, 'MakerNote',
-                              tag_dict=makernote.nikon.TAGS_NEW)
-            return
+                return note_offset + 10 + 8, makernote.load('nikon').TAGS_NEW, 1, self.offset, self.endian
+            # E99x or D1
+            logger.debug('Looks like an unlabeled type 2 Nikon MakerNote')
+            return note_offset, makernote.load('nikon').TAGS_NEW, 0, self.offset, self.endian
 
         # Olympus
         if make.startswith('OLYMPUS'):
-            self.dump_ifd(note.field_offset + 8, 'MakerNote', tag_dict=makernote.olympus.TAGS)
             # TODO
             #for i in (('MakerNote Tag 0x2020', makernote.OLYMPUS_TAG_0x2020),):
             #    self.decode_olympus_tag(self.tags[i[0]].values, i[1])
-            #return
+            return note_offset + 8, makernote.load('olympus').TAGS, 0, self.offset, self.endian
 
         # Casio
         if 'CASIO' in make or 'Casio' in make:
-            self.dump_ifd(note.field_offset, 'MakerNote',
-                          tag_dict=makernote.casio.TAGS)
-            return
+            return note_offset, makernote.load('casio').TAGS, 0, self.offset, self.endian
 
         # Fujifilm
         if make == 'FUJIFILM':
             # bug: everything else is "Motorola" endian, but the MakerNote
             # is "Intel" endian
-            endian = self.endian
-            self.endian = 'I'
             # bug: IFD offsets are from beginning of MakerNote, not
             # beginning of file header
-            offset = self.offset
-            self.offset += note.field_offset
             # process note with bogus values (note is actually at offset 12)
-            self.dump_ifd(12, 'MakerNote', tag_dict=makernote.fujifilm.TAGS)
-            # reset to correct values
-            self.endian = endian
-            self.offset = offset
-            return
+            return 12, makernote.load('fujifilm').TAGS, 0, self.offset + note_offset, 'I'
 
         # Apple
-        if make == 'Apple' and note.values[0:10] == [65, 112, 112, 108, 101, 32, 105, 79, 83, 0]:
-            offset = self.offset
-            self.offset += note.field_offset + 14
-            self.dump_ifd(0, 'MakerNote', tag_dict=makernote.apple.TAGS)
-            self.offset = offset
-            return
+        if make == 'Apple' and note_values[0:10] == [65, 112, 112, 108, 101, 32, 105, 79, 83, 0]:
+            return 0, makernote.load('apple').TAGS, 0, self.offset + note_offset + 14, self.endian
 
         # Canon
         if make == 'Canon':
-            self.dump_ifd(note.field_offset, 'MakerNote',
-                          tag_dict=makernote.canon.TAGS)
-
-            for i in (('MakerNote Tag 0x0001', makernote.canon.CAMERA_SETTINGS),
-                      ('MakerNote Tag 0x0002', makernote.canon.FOCAL_LENGTH),
-                      ('MakerNote Tag 0x0004', makernote.canon.SHOT_INFO),
-                      ('MakerNote Tag 0x0026', makernote.canon.AF_INFO_2),
-                      ('MakerNote Tag 0x0093', makernote.canon.FILE_INFO)):
-                if i[0] in self.tags:
-                    logger.debug('Canon %s', i[0])
-                    self._canon_decode_tag(self.tags[i[0]].values, i[1])
-                    del self.tags[i[0]]
-            if makernote.canon.CAMERA_INFO_TAG_NAME in self.tags:
-                tag = self.tags[makernote.canon.CAMERA_INFO_TAG_NAME]
-                logger.debug('Canon CameraInfo')
-                self._canon_decode_camera_info(tag)
-                del self.tags[makernote.canon.CAMERA_INFO_TAG_NAME]
-            return
-        
+            return note_offset, makernote.load('canon').TAGS, 0, self.offset, self.endian
+
         if 'FLIR' in make or 'Flir' in make:
-             self.dump_ifd(note.field_offset, 'MakerNote',
-                           tag_dict=makernote.flir.TAGS)
+            return note_offset, makernote.load('flir').TAGS, 0, self.offset, self.endian
 
-             return
+        return None
 
 #    TODO Decode Olympus MakerNote tag based on offset within tag.
 #    def _olympus_decode_tag(self, value, mn_tags):
@@ -550,26 +1111,27 @@ def _canon_decode_tag(self, value, mn_tags):
                 val = tag[1].get(value[i], 'Unknown')
             else:
                 val = value[i]
-            try:
-                logger.debug(" %s %s %s", i, name, hex(value[i]))
-            except TypeError:
-                logger.debug(" %s %s %s", i, name, value[i])
+            if self.trace:
+                try:
+                    self.trace(" %s %s %s", i, name, hex(value[i]))
+                except TypeError:
+                    self.trace(" %s %s %s", i, name, value[i])
 
             # It's not a real IFD Tag but we fake one to make everybody happy.
             # This will have a "proprietary" type
-            self.tags['MakerNote ' + name] = IfdTag(str(val), 0, 0, val, 0, 0)
+            self._tags[('MakerNote', name)] = IfdTag(str(val), 0, 0, val, 0, 0)
 
     def _canon_decode_camera_info(self, camera_info_tag):
         """
         Decode the variable length encoded camera info section.
         """
-        model = self.tags.get('Image Model', None)
+        model = self._tags.get(('Image', 'Model'), None)
         if not model:
             return
         model = str(model.values)
 
         camera_info_tags = {}
-        for (model_name_re, tag_desc) in makernote.canon.CAMERA_INFO_MODEL_MAP.items():
+        for (model_name_re, tag_desc) in makernote.load('canon').CAMERA_INFO_MODEL_MAP.items():
             if re.search(model_name_re, model):
                 camera_info_tags = tag_desc
                 break
@@ -597,9 +1159,10 @@ def _canon_decode_camera_info(self, camera_info_tag):
                     tag_value = tag[2](tag_value)
                 else:
                     tag_value = tag[2].get(tag_value, tag_value)
-            logger.debug(" %s %s", tag_name, tag_value)
+            if self.trace:
+                self.trace(" %s %s", tag_name, tag_value)
 
-            self.tags['MakerNote ' + tag_name] = IfdTag(str(tag_value), 0, 0, tag_value, 0, 0)
+            self._tags[('MakerNote', tag_name)] = IfdTag(str(tag_value), 0, 0, tag_value, 0, 0)
 
     def dump_xmp(self, xmp_bytes: bytes):
         """Adobe's Extensible Metadata Platform, just dump the pretty XML."""
@@ -616,13 +1179,13 @@ def dump_xmp(self, xmp_bytes: bytes):
             pretty = xml.dom.minidom.parseString(xmp_string).toprettyxml()
         except xml.parsers.expat.ExpatError:
             logger.warning("XMP: XML is not well formed")
-            self.tags['Image ApplicationNotes'] = IfdTag(xmp_string, 0, 1, xmp_bytes, 0, 0)
+            self._tags[('Image', 'ApplicationNotes')] = IfdTag(xmp_string, 0, 1, xmp_bytes, 0, 0)
             return
         cleaned = []
         for line in pretty.splitlines():
             if line.strip():
                 cleaned.append(line)
-        self.tags['Image ApplicationNotes'] = IfdTag('\n'.join(cleaned), 0, 1, xmp_bytes, 0, 0)
+        self._tags[('Image', 'ApplicationNotes')] = IfdTag('\n'.join(cleaned), 0, 1, xmp_bytes, 0, 0)
 
 
     def clean_tags(self):
@@ -634,7 +1197,8 @@ def clean_tags(self):
         _type_
             _description_
         """
-        
+        from .xmp import XMP  # pylint: disable=import-outside-toplevel
+
         # clean_tags = {k.split(' ')[1]: v.values for k,v in self.tags.items()}
         clean_tags = {k.split(' ')[1]: XMP.format_object(v.printable) for k,v in self.tags.items()}
 
@@ -646,6 +1210,8 @@ def clean_tags(self):
     
     def parse_xmp(self, xmp_bytes: bytes):
 
+        from .xmp import XMP  # pylint: disable=import-outside-toplevel
+
         # Create XMP object
         self.xmp = XMP(xmp_bytes)
         # Get tags as dict
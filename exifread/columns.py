@@ -0,0 +1,234 @@
+"""
+Extract fields of many image files into NumPy columns.
+"""
+
+import struct
+from array import array
+from fractions import Fraction
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from . import _determine_type, _make_header, _read_exif_segment
+from .exif_log import get_logger
+from .tags import FIELD_TYPES
+from .tags.exif import EXIF_TAGS, GPS_TAGS
+
+logger = get_logger()
+
+# fields extracted by default
+DEFAULT_FIELDS = (
+    'DateTimeOriginal', 'ExposureTime', 'FNumber', 'ISOSpeedRatings', 'FocalLength',
+    'GPSLatitude', 'GPSLongitude', 'GPSAltitude', 'Make', 'Model',
+)
+
+# kind of column of the fields which are not guessed from their field type
+FIELD_KINDS = {
+    'DateTime': 'time',
+    'DateTimeOriginal': 'time',
+    'DateTimeDigitized': 'time',
+    'GPSLatitude': 'degrees',
+    'GPSLongitude': 'degrees',
+    'GPSDestLatitude': 'degrees',
+    'GPSDestLongitude': 'degrees',
+}
+
+# struct format code of a value of each field type, ASCII excluded
+TYPE_CODES = {1: 'B', 3: 'H', 4: 'I', 5: 'II', 6: 'b', 7: 'B', 8: 'h', 9: 'i', 10: 'ii', 11: 'f', 12: 'd', 13: 'I'}
+
+# positions of the digits in 'YYYY:MM:DD HH:MM:SS'
+TIME_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+
+
+def _locations(field: str) -> list:
+    """Return the (IFD name, tag ID) a field is looked for at, in order."""
+    locations = [(ifd_name, tag) for ifd_name in ('Image', 'EXIF')
+                 for tag, tag_entry in EXIF_TAGS.items() if tag_entry[0] == field]
+    locations += [('GPS', tag) for tag, tag_entry in GPS_TAGS.items() if tag_entry[0] == field]
+    if not locations:
+        raise ValueError('Unknown field %s' % field)
+    return locations
+
+
+def _read_values(hdr, order: str, field_type: int, count: int, value_offset: int, limit: int):
+    """Return the first ``limit`` values of an entry as a flat tuple, ratios as numerator and denominator."""
+    count = min(count, limit)
+    code = TYPE_CODES[field_type]
+    raw = hdr.read(value_offset - hdr.offset, count * FIELD_TYPES[field_type][0])
+    return struct.unpack(order + code * count, raw)
+
+
+def _civil_to_days(year, month, day):
+    """Return the days since 1970-01-01 of dates of the proleptic Gregorian calendar."""
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * np.where(month > 2, month - 3, month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+class _Column:
+    """Values of a field, appended file by file."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.missing = array('B')
+        # ratios, and numbers of other types over 1
+        self.num = array('q')
+        self.den = array('q')
+        # integers, or hemisphere signs of degrees
+        self.ints = array('q')
+        self.strings = []  # type: list
+
+    def fill(self, rows: int) -> None:
+        """Add missing values up to ``rows`` rows."""
+        while len(self.missing) < rows:
+            self.missing.append(1)
+            self.num.append(0)
+            self.den.append(0)
+            self.ints.append(0)
+            self.strings.append(b'')
+            if self.kind == 'degrees':
+                self.num.extend((0, 0))
+                self.den.extend((0, 0))
+
+    def add(self, hdr, order: str, field_type: int, count: int, value_offset: int, sign=1) -> None:
+        if not 0 < field_type < len(FIELD_TYPES) or count < 1:
+            return
+        if self.kind is None:
+            if field_type == 2:
+                self.kind = 'str'
+            elif field_type in (5, 10, 11, 12):
+                self.kind = 'float'
+            else:
+                self.kind = 'int'
+
+        if self.kind in ('str', 'time'):
+            if field_type != 2:
+                return
+            value = hdr.read(value_offset - hdr.offset, count).split(b'\x00', 1)[0]
+            self.strings.append(value)
+            self.num.append(0)
+            self.den.append(0)
+            self.ints.append(0)
+        else:
+            if field_type == 2:
+                return
+            if self.kind == 'degrees':
+                if count < 3 or field_type not in (5, 10):
+                    return
+                values = _read_values(hdr, order, field_type, count, value_offset, 3)
+                self.num.extend(values[0::2])
+                self.den.extend(values[1::2])
+                self.ints.append(sign)
+            else:
+                values = _read_values(hdr, order, field_type, count, value_offset, 1)
+                if field_type in (5, 10):
+                    num, den = values
+                elif field_type in (11, 12):
+                    num, den = Fraction(values[0]).limit_denominator(1 << 31).as_integer_ratio() \
+                        if values[0] == values[0] else (0, 0)
+                else:
+                    num, den = values[0], 1
+                self.num.append(num)
+                self.den.append(den)
+                self.ints.append(num // den if den else 0)
+            self.strings.append(b'')
+        self.missing.append(0)
+
+    def finish(self) -> np.ma.MaskedArray:
+        missing = np.frombuffer(self.missing, dtype=np.uint8).astype(bool)
+        if self.kind in ('float', 'degrees', None):
+            num = np.frombuffer(self.num, dtype=np.int64).astype(np.float64)
+            den = np.frombuffer(self.den, dtype=np.int64).astype(np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratios = num / den
+            if self.kind == 'degrees':
+                values = ratios.reshape(-1, 3) @ np.array([1, 1 / 60, 1 / 3600]) \
+                    * np.frombuffer(self.ints, dtype=np.int64)
+            else:
+                values = ratios
+            values[missing] = 0
+        elif self.kind == 'int':
+            values = np.frombuffer(self.ints, dtype=np.int64).copy()
+            missing |= np.frombuffer(self.den, dtype=np.int64) == 0
+        elif self.kind == 'str':
+            values = np.array([value.decode('utf-8', 'replace') for value in self.strings], dtype=str)
+        else:
+            values, invalid = _parse_times(self.strings)
+            missing |= invalid
+        return np.ma.MaskedArray(values, mask=missing)
+
+
+def _parse_times(strings: list) -> tuple:
+    """Return the 'YYYY:MM:DD HH:MM:SS' times as seconds since the epoch, and the invalid ones."""
+    chars = np.array(strings, dtype='S19').view(np.uint8).reshape(-1, 19).astype(np.int64)
+    digits = chars[:, TIME_DIGITS] - ord('0')
+    invalid = np.any((digits < 0) | (digits > 9), axis=1)  # type: np.ndarray
+    digits = np.where(invalid[:, None], 0, digits)
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month, day, hour, minute, second = (digits[:, i] * 10 + digits[:, i + 1] for i in range(4, 14, 2))
+    invalid |= (month < 1) | (month > 12) | (day < 1) | (day > 31) | (hour > 23) | (minute > 59) | (second > 60)
+    seconds = _civil_to_days(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+    return np.where(invalid, 0, seconds), invalid
+
+
+def _extract_file(fh, locations: dict, ifd_names: set, columns: dict) -> None:
+    offset, endian, fake_exif, length = _determine_type(fh)
+    # the Exif segment in memory, but for TIFF files where it is the whole file
+    data = _read_exif_segment(fh, offset, length) if length is not None else None
+    hdr = _make_header(fh, endian, offset, fake_exif, False, False, False, False, data, offset, False)
+    order = '<' if hdr.endian == 'I' else '>'
+
+    table = hdr.index(ifd_names)
+    rows = {}  # type: Dict[Tuple[str, int], int]
+    # the first entry of a tag in an IFD counts
+    for index in range(len(table) - 1, -1, -1):
+        rows[(table.ifds[table.ifd_ids[index]][0], table.tags[index])] = index
+
+    for field, field_locations in locations.items():
+        for key in field_locations:
+            row = rows.get(key)
+            if row is None:
+                continue
+            sign = 1
+            if columns[field].kind == 'degrees':
+                # the reference (N, S, E or W) is the tag before
+                ref = rows.get((key[0], key[1] - 1))
+                if ref is not None and hdr.read(table.value_offsets[ref] - hdr.offset, 1) in (b'S', b'W'):
+                    sign = -1
+            columns[field].add(hdr, order, table.field_types[row], table.counts[row],
+                               table.value_offsets[row], sign)
+            break
+
+
+def extract_columns(paths: Iterable[str], fields=DEFAULT_FIELDS) -> dict:
+    """
+    Extract fields of image files into NumPy columns, one row per file.
+
+    ``fields`` are tag names of the first IFD and of the EXIF and GPS IFDs.
+    Returns a dict of masked arrays by field, masked where a file has no
+    such tag (or no Exif data at all): float64 for ratios and floats, with
+    GPS coordinates in signed decimal degrees, int64 for integers and for
+    times (seconds since the epoch, times without a zone taken as UTC), and
+    fixed-width unicode for strings.
+
+    The IFDs are only mapped, the values of the fields are read straight
+    into the columns, without building tag objects.
+    """
+    locations = {field: _locations(field) for field in fields}
+    ifd_names = {ifd_name for field_locations in locations.values() for ifd_name, _ in field_locations}
+    columns = {field: _Column(FIELD_KINDS.get(field)) for field in fields}
+    rows = 0
+    for path in paths:
+        rows += 1
+        try:
+            with open(path, 'rb') as fh:
+                _extract_file(fh, locations, ifd_names, columns)
+        except Exception as err:  # pylint: disable=broad-except
+            logger.debug('%s: %s', path, err)
+        for column in columns.values():
+            # the fields the file has not, or all of them when it failed
+            column.fill(rows)
+    return {field: column.finish() for field, column in columns.items()}
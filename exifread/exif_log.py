@@ -20,6 +20,22 @@ def get_logger():
     return logging.getLogger("exifread")
 
 
+def get_trace():
+    """
+    Return the debug logging function if debug output is enabled, else None.
+
+    Checked once, this lets hot loops skip building debug messages at no cost::
+
+        trace = get_trace()
+        if trace:
+            trace('%s', expensive())
+    """
+    logger = get_logger()
+    if logger.isEnabledFor(logging.DEBUG):
+        return logger.debug
+    return None
+
+
 def setup_logger(debug, color):
     """Configure the logger."""
 
@@ -9,6 +9,7 @@
 #   1) the 'iinf' box contains 'infe' records, we look for the item_id for 'Exif'.
 #   2) once we have the item_id, we find a matching entry in the 'iloc' box, which
 #      gives us position and size information.
+# The XMP data is found the same way, from the 'mime' item holding RDF/XML.
 
 import struct
 from typing import List, Dict, Callable, BinaryIO, Optional
@@ -41,9 +42,11 @@ class Box:
     subs = {}  # type: Dict[str, Box]
     locs = {}  # type: Dict
     exif_infe = None  # type: Optional[Box]
+    xmp_infe = None  # type: Optional[Box]
     item_id = 0
     item_type = b''
     item_name = b''
+    content_type = b''
     item_protection_index = 0
     major_brand = b''
     offset_size = 0
@@ -78,15 +81,24 @@ class HEICExifFinder:
     def __init__(self, file_handle: BinaryIO):
         self.file_handle = file_handle
 
+    def read(self, nbytes: int) -> bytes:
+        return self.file_handle.read(nbytes)
+
+    def tell(self) -> int:
+        return self.file_handle.tell()
+
+    def seek(self, pos: int):
+        self.file_handle.seek(pos)
+
     def get(self, nbytes: int) -> bytes:
-        read = self.file_handle.read(nbytes)
+        read = self.read(nbytes)
         if not read:
             raise EOFError
         if len(read) != nbytes:
             msg = "get(nbytes={nbytes}) found {read} bytes at position {pos}".format(
                 nbytes=nbytes,
                 read=len(read),
-                pos=self.file_handle.tell()
+                pos=self.tell()
             )
             raise BadSize(msg)
         return read
@@ -128,7 +140,7 @@ def get_string(self) -> bytes:
         return b''.join(read)
 
     def next_box(self) -> Box:
-        pos = self.file_handle.tell()
+        pos = self.tell()
         size = self.get32()
         kind = self.get(4).decode('ascii')
         box = Box(kind)
@@ -143,14 +155,14 @@ def next_box(self) -> Box:
         else:
             box.size = size - 8
             box.after = pos + size
-        box.pos = self.file_handle.tell()
+        box.pos = self.tell()
         return box
 
     def get_full(self, box: Box):
         box.set_full(self.get32())
 
     def skip(self, box: Box):
-        self.file_handle.seek(box.after)
+        self.seek(box.after)
 
     def expect_parse(self, name: str) -> Box:
         while True:
@@ -176,7 +188,7 @@ def parse_box(self, box: Box) -> Box:
         probe = self.get_parser(box)
         probe(box)
         # in case anything is left unread
-        self.file_handle.seek(box.after)
+        self.seek(box.after)
         return box
 
     def _parse_ftyp(self, box: Box):
@@ -190,7 +202,7 @@ def _parse_ftyp(self, box: Box):
 
     def _parse_meta(self, meta: Box):
         self.get_full(meta)
-        while self.file_handle.tell() < meta.after:
+        while self.tell() < meta.after:
             box = self.next_box()
             psub = self.get_parser(box)
             if psub is not None:
@@ -211,17 +223,24 @@ def _parse_infe(self, box: Box):
             box.item_protection_index = self.get16()
             box.item_type = self.get(4)
             box.item_name = self.get_string()
+            if box.item_type == b'mime':
+                box.content_type = self.get_string()
             # ignore the rest
 
     def _parse_iinf(self, box: Box):
         self.get_full(box)
         count = self.get16()
         box.exif_infe = None
+        box.xmp_infe = None
         for _ in range(count):
             infe = self.expect_parse('infe')
             if infe.item_type == b'Exif':
                 logger.debug("HEIC: found Exif 'infe' box")
                 box.exif_infe = infe
+            elif infe.content_type == b'application/rdf+xml':
+                logger.debug("HEIC: found XMP 'infe' box")
+                box.xmp_infe = infe
+            if box.exif_infe and box.xmp_infe:
                 break
 
     def _parse_iloc(self, box: Box):
@@ -272,9 +291,9 @@ def find_exif(self) -> tuple:
         logger.debug('HEIC: found Exif location.')
         # we expect the Exif data to be in one piece.
         assert len(extents) == 1
-        pos, _ = extents[0]
+        pos, length = extents[0]
         # looks like there's a kind of pseudo-box here.
-        self.file_handle.seek(pos)
+        self.seek(pos)
         # the payload of "Exif" item may be start with either
         # b'\xFF\xE1\xSS\xSSExif\x00\x00' (with APP1 marker, e.g. Android Q)
         # or
@@ -283,6 +302,50 @@ def find_exif(self) -> tuple:
         exif_tiff_header_offset = self.get32()
         assert exif_tiff_header_offset >= 6
         assert self.get(exif_tiff_header_offset)[-6:] == b'Exif\x00\x00'
-        offset = self.file_handle.tell()
-        endian = self.file_handle.read(1)
-        return offset, endian
+        offset = self.tell()
+        endian = self.read(1)
+        return offset, endian, length - 4 - exif_tiff_header_offset
+
+    def find_xmp(self) -> bytes:
+        """Return the XMP packet, b'' if there is none."""
+        ftyp = self.expect_parse('ftyp')
+        if ftyp.major_brand != b'heic':
+            logger.warning('HEIC: unexpected major brand %r, XMP skipped', ftyp.major_brand)
+            return b''
+        meta = self.expect_parse('meta')
+        infe = meta.subs['iinf'].xmp_infe
+        if infe is None:
+            return b''
+        extents = meta.subs['iloc'].locs.get(infe.item_id)
+        if extents is None:
+            logger.warning('HEIC: no location for the XMP item, skipped')
+            return b''
+        logger.debug('HEIC: found XMP location.')
+        xmp = []
+        for pos, length in extents:
+            self.seek(pos)
+            xmp.append(self.get(length))
+        return b''.join(xmp)
+
+
+class HEICReaderExifFinder(HEICExifFinder):
+    """
+    Find Exif data in an HEIC file read with a ``read_at(offset, size)``
+    function, e.g. slicing a file held in memory.
+    """
+
+    def __init__(self, read_at: Callable):  # pylint: disable=super-init-not-called
+        # no file handle, reads go through read_at()
+        self.read_at = read_at
+        self.pos = 0
+
+    def read(self, nbytes: int) -> bytes:
+        read = bytes(self.read_at(self.pos, nbytes))
+        self.pos += len(read)
+        return read
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, pos: int):
+        self.pos = pos
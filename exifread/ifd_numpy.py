@@ -0,0 +1,59 @@
+"""
+Decode the entry tables of large IFDs with NumPy, all the entries at once.
+
+Used by ``ExifHeader.dump_ifd()`` when NumPy is installed, the results are
+the same as entry by entry.
+"""
+
+import numpy as np
+
+from .tags import FIELD_TYPES
+
+# length of the field types, 0 for unknown ones
+TYPE_LENGTHS = np.array([field_type[0] for field_type in FIELD_TYPES] + [0], dtype=np.int64)
+
+# integer types, a single value of which is read from the entry itself
+INTEGER_TYPES = np.array([1, 3, 4, 6, 7, 8, 9, 13])
+SIGNED_TYPES = np.array([6, 8, 9])
+
+ENTRY_DTYPES = {
+    order: np.dtype([('tag', order + 'u2'), ('type', order + 'u2'),
+                     ('count', order + 'u4'), ('value', order + 'u4')])
+    for order in '<>'
+}
+
+
+def decode_entries(table: bytes, endian: str, ifd: int, relative, fake_exif) -> tuple:
+    """
+    Decode an IFD entry table, ``ifd`` being its offset.
+
+    Returns the tag IDs, field types, counts and value offsets of the
+    entries as lists, and their value when it is a single integer (None
+    otherwise). Value offsets follow the pointers of the values which do
+    not fit in an entry, as ``ExifHeader._process_entry()`` does.
+    """
+    order = '<' if endian == 'I' else '>'
+    entries = np.frombuffer(table, dtype=ENTRY_DTYPES[order], count=len(table) // 12)
+    types = entries['type'].astype(np.int64)
+    lengths = TYPE_LENGTHS[np.minimum(types, len(FIELD_TYPES))]
+    counts = entries['count'].astype(np.int64)
+    value = entries['value'].astype(np.int64)
+
+    pointers = value
+    if relative:
+        pointers = value + ifd - 8 + (18 if fake_exif else 0)
+    inline = ifd + 10 + 12 * np.arange(len(entries), dtype=np.int64)
+    offsets = np.where(counts * lengths > 4, pointers, inline)
+
+    # a single value is in the first bytes of the value field
+    if order == '<':
+        ints = np.select([lengths == 1, lengths == 2], [value & 0xFF, value & 0xFFFF], value)
+    else:
+        ints = np.select([lengths == 1, lengths == 2], [value >> 24, value >> 16], value)
+    half = np.left_shift(1, np.maximum(lengths, 1) * 8 - 1)
+    ints = np.where(np.isin(types, SIGNED_TYPES) & (ints >= half), ints - 2 * half, ints)
+    single = (counts == 1) & np.isin(types, INTEGER_TYPES)
+
+    values = [int_value if is_single else None
+              for int_value, is_single in zip(ints.tolist(), single.tolist())]
+    return entries['tag'].tolist(), types.tolist(), counts.tolist(), offsets.tolist(), values
@@ -0,0 +1,145 @@
+"""
+Index of the tags of the image files of a directory tree, kept up to date incrementally.
+"""
+
+import pickle
+import sqlite3
+from collections import namedtuple
+from typing import Dict, List, Tuple
+
+from .batch import process_files
+from .cache import options_key
+from .exceptions import ExifNotFound, InvalidExif
+from .scanner import IMAGE_EXTENSIONS, walk_entries
+
+# files stored per transaction while rescanning
+COMMIT_EVERY = 1000
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS files ('
+    ' path TEXT PRIMARY KEY,'
+    ' size INTEGER NOT NULL, mtime INTEGER NOT NULL, inode INTEGER NOT NULL,'
+    ' data BLOB NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)',
+)
+
+Changes = namedtuple('Changes', 'added changed removed errors')
+Changes.__doc__ = """Paths added, changed and removed by a rescan, and the exceptions raised by path."""
+
+
+class DirectoryIndex:
+    """
+    Tags of the image files under ``root``, kept in an SQLite database at
+    ``path`` (':memory:' for none).
+
+    ``rescan()`` walks the tree with ``os.scandir()`` and only processes the
+    files added, or changed since (size, modification time or inode), the
+    others are not opened: a rescan takes time in proportion to the number
+    of files, not to their size. The tags of the files removed are dropped.
+
+    ``extensions`` restricts the files indexed by suffix, ``None`` for all.
+    Options are the same as for ``process_file()``, the index is rebuilt
+    when they change. Tags are stored pickled, only open indexes you trust.
+    """
+
+    def __init__(self, root: str, path: str, extensions=IMAGE_EXTENSIONS, **kwargs):
+        self.root = root
+        self.path = path
+        self.extensions = extensions
+        self.options = kwargs
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        options = options_key(kwargs)
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'options'").fetchone()
+        if row is None or row[0] != options:
+            self._db.execute('DELETE FROM files')
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('options', ?)", (options, ))
+        self._db.commit()
+
+    def rescan(self, workers=None) -> Changes:
+        """
+        Bring the index up to date with the tree, processing the files added
+        or changed on a pool of ``workers`` threads (see ``process_files()``).
+
+        Returns the paths added, changed and removed. Files without Exif data
+        are indexed with no tags, the files which could not be processed are
+        left out of the index and tried again on the next rescan.
+
+        Files are indexed with the size, modification time and inode seen
+        when walking the tree: a file rewritten while it is processed may be
+        indexed with either version of its tags, it is processed again on
+        the next rescan.
+        """
+        known = {path: (size, mtime, inode)
+                 for path, size, mtime, inode in self._db.execute('SELECT path, size, mtime, inode FROM files')}
+        added = []  # type: List[str]
+        changed = []  # type: List[str]
+        stats = {}  # type: Dict[str, Tuple[int, int, int]]
+        for entry in walk_entries(self.root, self.extensions):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            previous = known.pop(entry.path, None)
+            if previous == signature:
+                continue
+            (added if previous is None else changed).append(entry.path)
+            stats[entry.path] = signature
+
+        # what is left was not found in the tree
+        removed = list(known)
+        self._db.executemany('DELETE FROM files WHERE path = ?', ((path, ) for path in removed))
+
+        errors = {}  # type: Dict[str, Exception]
+        stored = 0
+        for path, tags in process_files(added + changed, workers=workers, **self.options):
+            if isinstance(tags, (ExifNotFound, InvalidExif)):
+                # indexed too, not to be processed again
+                tags = {}
+            elif isinstance(tags, Exception):
+                errors[path] = tags
+                continue
+            # the signature seen before processing, a file changed since no longer matches it
+            self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)',
+                             (path, ) + stats[path] + (pickle.dumps(tags, pickle.HIGHEST_PROTOCOL), ))
+            stored += 1
+            if stored % COMMIT_EVERY == 0:
+                self._db.commit()
+        # changed files which failed keep no stale tags
+        self._db.executemany('DELETE FROM files WHERE path = ?', ((path, ) for path in errors))
+        self._db.commit()
+        return Changes(added, changed, removed, errors)
+
+    def __getitem__(self, path: str):
+        row = self._db.execute('SELECT data FROM files WHERE path = ?', (path, )).fetchone()
+        if row is None:
+            raise KeyError(path)
+        return pickle.loads(row[0])
+
+    def get(self, path: str, default=None):
+        try:
+            return self[path]
+        except KeyError:
+            return default
+
+    def __contains__(self, path: str) -> bool:
+        return self._db.execute('SELECT 1 FROM files WHERE path = ?', (path, )).fetchone() is not None
+
+    def __iter__(self):
+        return (path for path, in self._db.execute('SELECT path FROM files ORDER BY path').fetchall())
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
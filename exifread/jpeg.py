@@ -1,155 +1,127 @@
 from typing import BinaryIO
 
-from .utils import ord_
-from .exif_log import get_logger
+from .utils import ord_, file_reader, buffer_reader
+from .exif_log import get_logger, get_trace
 from .exceptions import InvalidExif
 
 logger = get_logger()
 
+# markers without a length, no payload follows them
+STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
 
-def _increment_base(data, base):
-    return ord_(data[base + 2]) * 256 + ord_(data[base + 3]) + 2
+# code of the APP1 segment holding the XMP packet
+XMP_NAMESPACE = b"http://ns.adobe.com/xap/1.0/\x00"
 
 
-def _get_initial_base(fh: BinaryIO, data, fake_exif) -> tuple:
-    base = 2
-    logger.debug("data[2]=0x%X data[3]=0x%X data[6:10]=%s", ord_(data[2]), ord_(data[3]), data[6:10])
-    while ord_(data[2]) == 0xFF and data[6:10] in (b"JFIF", b"JFXX", b"OLYM", b"Phot"):
-        length = ord_(data[4]) * 256 + ord_(data[5])
-        logger.debug(" Length offset is %s", length)
-        fh.read(length - 8)
+def _get_fake_exif(data, fake_exif) -> int:
+    trace = get_trace()
+    if trace:
+        trace("data[2]=0x%X data[3]=0x%X data[6:10]=%s", ord_(data[2]), ord_(data[3]), bytes(data[6:10]))
+    if ord_(data[2]) == 0xFF and data[6:10] in (b"JFIF", b"JFXX", b"OLYM", b"Phot"):
         # fake an EXIF beginning of file
         # I don't think this is used. --gd
-        data = b"\xFF\x00" + fh.read(10)
         fake_exif = 1
-        if base > 2:
-            logger.debug(" Added to base")
-            base = base + length + 4 - 2
-        else:
-            logger.debug(" Added to zero")
-            base = length + 4
-        logger.debug(" Set segment base to 0x%X", base)
-    return base, fake_exif
-
-
-def _get_base(base, data) -> int:
-    # pylint: disable=too-many-statements
+    return fake_exif
+
+
+def _walk_segments(read_at) -> list:
+    """
+    Walk the JPEG markers, ``read_at(offset, size)`` returns the bytes at an offset.
+
+    Only the 4 bytes marker and length header of each segment is read, the
+    segment bodies are skipped. The walk ends where the image data starts.
+    """
+    trace = get_trace()
+    segments = []
+    base = 2
     while True:
-        logger.debug(" Segment base 0x%X", base)
-        if data[base : base + 2] == b"\xFF\xE1":
-            # APP1
-            logger.debug("  APP1 at base 0x%X", base)
-            logger.debug("  Length: 0x%X 0x%X", ord_(data[base + 2]), ord_(data[base + 3]))
-            logger.debug("  Code: %s", data[base + 4 : base + 8])
-            if data[base + 4 : base + 8] == b"Exif":
-                logger.debug("  Decrement base by 2 to get to pre-segment header (for compatibility with later code)")
-                base -= 2
-                break
-            increment = _increment_base(data, base)
-            logger.debug(" Increment base by %s", increment)
-            base += increment
-        elif data[base : base + 2] == b"\xFF\xE0":
-            # APP0
-            logger.debug("  APP0 at base 0x%X", base)
-            logger.debug("  Length: 0x%X 0x%X", ord_(data[base + 2]), ord_(data[base + 3]))
-            logger.debug("  Code: %s", data[base + 4 : base + 8])
-            increment = _increment_base(data, base)
-            logger.debug(" Increment base by %s", increment)
-            base += increment
-        elif data[base : base + 2] == b"\xFF\xE2":
-            # APP2
-            logger.debug("  APP2 at base 0x%X", base)
-            logger.debug("  Length: 0x%X 0x%X", ord_(data[base + 2]), ord_(data[base + 3]))
-            logger.debug(" Code: %s", data[base + 4 : base + 8])
-            increment = _increment_base(data, base)
-            logger.debug(" Increment base by %s", increment)
-            base += increment
-        elif data[base : base + 2] == b"\xFF\xEE":
-            # APP14
-            logger.debug("  APP14 Adobe segment at base 0x%X", base)
-            logger.debug("  Length: 0x%X 0x%X", ord_(data[base + 2]), ord_(data[base + 3]))
-            logger.debug("  Code: %s", data[base + 4 : base + 8])
-            increment = _increment_base(data, base)
-            logger.debug(" Increment base by %s", increment)
-            base += increment
-            logger.debug("  There is useful EXIF-like data here, but we have no parser for it.")
-        elif data[base : base + 2] == b"\xFF\xDB":
-            logger.debug("  JPEG image data at base 0x%X No more segments are expected.", base)
+        header = read_at(base, 4)
+        if len(header) < 2 or header[0] != 0xFF:
+            if trace:
+                trace(" No marker at base 0x%X, end of segments", base)
+            break
+        marker = header[1]
+        if marker == 0xFF:
+            # fill byte before a marker
+            base += 1
+            continue
+        if marker in STANDALONE_MARKERS:
+            base += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            if trace:
+                trace("  JPEG image data at base 0x%X No more segments are expected.", base)
             break
-        elif data[base : base + 2] == b"\xFF\xD8":
-            # APP12
-            logger.debug("  FFD8 segment at base 0x%X", base)
-            logger.debug(
-                "  Got 0x%X 0x%X and %s instead", ord_(data[base]), ord_(data[base + 1]), data[4 + base : 10 + base]
-            )
-            logger.debug("  Length: 0x%X 0x%X", ord_(data[base + 2]), ord_(data[base + 3]))
-            logger.debug("  Code: %s", data[base + 4 : base + 8])
-            increment = _increment_base(data, base)
-            logger.debug("  Increment base by %s", increment)
-            base += increment
-        elif data[base : base + 2] == b"\xFF\xEC":
-            # APP12
-            logger.debug("  APP12 XMP (Ducky) or Pictureinfo segment at base 0x%X", base)
-            logger.debug("  Got 0x%X and 0x%X instead", ord_(data[base]), ord_(data[base + 1]))
-            logger.debug("  Length: 0x%X 0x%X", ord_(data[base + 2]), ord_(data[base + 3]))
-            logger.debug("Code: %s", data[base + 4 : base + 8])
-            increment = _increment_base(data, base)
-            logger.debug("  Increment base by %s", increment)
-            base += increment
-            logger.debug(
-                "  There is useful EXIF-like data here (quality, comment, copyright), " "but we have no parser for it."
-            )
-        else:
-            try:
-                increment = _increment_base(data, base)
-                logger.debug("  Got 0x%X and 0x%X instead", ord_(data[base]), ord_(data[base + 1]))
-            except IndexError as err:
-                raise InvalidExif("Unexpected/unhandled segment type or file content.") from err
-            else:
-                logger.debug("  Increment base by %s", increment)
-                base += increment
-    return base
+        length = header[2] * 256 + header[3] if len(header) == 4 else 0
+        if length < 2:
+            if trace:
+                trace(" Truncated segment 0x%X at base 0x%X", marker, base)
+            break
+        if trace:
+            trace(" Segment 0x%X at base 0x%X, length %s", marker, base, length)
+        segments.append((marker, base + 4, length - 2))
+        base += length + 2
+    return segments
+
+
+def read_segments(fh: BinaryIO) -> list:
+    """
+    Map the segments of a JPEG file.
+
+    Returns a list of (marker, offset, length) tuples, e.g. (0xE1, 24, 3012)
+    for an APP1 segment, where offset and length are those of the segment
+    payload, after its length bytes.
+    """
+    return _walk_segments(file_reader(fh))
+
+
+def read_segments_in_buffer(data) -> list:
+    """Same as ``read_segments()`` for a JPEG file held in memory."""
+    return _walk_segments(buffer_reader(data))
+
+
+def _find_exif_segment(segments, read_at) -> tuple:
+    for marker, offset, length in segments:
+        # APP1 segments may also hold XMP
+        if marker == 0xE1 and read_at(offset, 6) == b"Exif\x00\x00":
+            # skip the Exif code, the TIFF header follows
+            return offset + 6, length - 6
+    # no EXIF information
+    raise InvalidExif("No EXIF header found in the APP1 segments.")
+
+
+def find_jpeg_xmp(read_at) -> bytes:
+    """Return the XMP packet of a JPEG file, from its APP1 segment, or b''."""
+    for marker, offset, length in _walk_segments(read_at):
+        if marker == 0xE1 and read_at(offset, len(XMP_NAMESPACE)) == XMP_NAMESPACE:
+            return bytes(read_at(offset + len(XMP_NAMESPACE), length - len(XMP_NAMESPACE)))
+    return b""
 
 
 def find_jpeg_exif(fh: BinaryIO, data, fake_exif) -> tuple:
-    logger.debug("JPEG format recognized data[0:2]=0x%X%X", ord_(data[0]), ord_(data[1]))
-
-    base, fake_exif = _get_initial_base(fh, data, fake_exif)
-
-    # Big ugly patch to deal with APP2 (or other) data coming before APP1
-    fh.seek(0)
-    # in theory, this could be insufficient since 64K is the maximum size--gd
-    data = fh.read(base + 4000)
-
-    base = _get_base(base, data)
-
-    fh.seek(base + 12)
-    if ord_(data[2 + base]) == 0xFF and data[6 + base : 10 + base] == b"Exif":
-        # detected EXIF header
-        offset = fh.tell()
-        endian = fh.read(1)
-        # HACK TEST:  endian = 'M'
-    elif ord_(data[2 + base]) == 0xFF and data[6 + base : 10 + base + 1] == b"Ducky":
-        # detected Ducky header.
-        logger.debug(
-            "EXIF-like header (normally 0xFF and code): 0x%X and %s",
-            ord_(data[2 + base]),
-            data[6 + base : 10 + base + 1],
-        )
-        offset = fh.tell()
-        endian = fh.read(1)
-    elif ord_(data[2 + base]) == 0xFF and data[6 + base : 10 + base + 1] == b"Adobe":
-        # detected APP14 (Adobe)
-        logger.debug(
-            "EXIF-like header (normally 0xFF and code): 0x%X and %s",
-            ord_(data[2 + base]),
-            data[6 + base : 10 + base + 1],
-        )
-        offset = fh.tell()
-        endian = fh.read(1)
-    else:
-        # no EXIF information
-        msg = "No EXIF header expected data[2+base]==0xFF and data[6+base:10+base]===Exif (or Duck)"
-        msg += "Did get 0x%X and %s" % (ord_(data[2 + base]), data[6 + base : 10 + base + 1])
-        raise InvalidExif(msg)
-    return offset, endian, fake_exif
+    trace = get_trace()
+    if trace:
+        trace("JPEG format recognized data[0:2]=0x%X%X", ord_(data[0]), ord_(data[1]))
+
+    fake_exif = _get_fake_exif(data, fake_exif)
+    read_at = file_reader(fh)
+    offset, length = _find_exif_segment(_walk_segments(read_at), read_at)
+    endian = read_at(offset, 1)
+    return offset, endian, fake_exif, length
+
+
+def find_jpeg_exif_in_buffer(data) -> tuple:
+    """
+    Same as ``find_jpeg_exif()`` for a file held in memory.
+
+    The segments are walked by slicing ``data``, nothing is copied but the
+    few header bytes looked at.
+    """
+    trace = get_trace()
+    if trace:
+        trace("JPEG format recognized data[0:2]=0x%X%X", ord_(data[0]), ord_(data[1]))
+
+    fake_exif = _get_fake_exif(data[:12], 0)
+    read_at = buffer_reader(data)
+    offset, length = _find_exif_segment(_walk_segments(read_at), read_at)
+    return offset, read_at(offset, 1), fake_exif, length
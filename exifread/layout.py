@@ -0,0 +1,59 @@
+"""
+Cache of the IFD layouts of files from the same camera.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def signature(table) -> bytes:
+    """Return the tag IDs, field types and counts of an IFD entry table, without the values."""
+    return b''.join(table[k::12] for k in range(8))
+
+
+class LayoutCache:
+    """
+    Entries processed in the IFDs of each layout seen, to process the IFDs
+    of later files with the same layout without reading all their entries.
+
+    A layout is the tag IDs, field types and counts of an IFD, in order,
+    which the files from one camera model and firmware share. It is checked
+    against every IFD before use, an IFD of another layout is walked entry
+    by entry and its layout kept, up to ``maxsize`` layouts.
+
+    ``hits`` counts the IFDs processed from a known layout, ``misses`` the
+    IFDs walked. A cache can be shared by threads.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._layouts = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the entries processed for a layout, None when it is unknown."""
+        with self._lock:
+            entries = self._layouts.get(key)
+            if entries is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._layouts.move_to_end(key)
+            return entries
+
+    def put(self, key, entries: tuple) -> None:
+        with self._lock:
+            self._layouts[key] = entries
+            if len(self._layouts) > self.maxsize:
+                self._layouts.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._layouts.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._layouts)
@@ -0,0 +1,102 @@
+"""
+Scan a directory tree on a pool of processes.
+"""
+
+import importlib
+import os
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List, Tuple
+
+from . import _process_file
+
+# suffixes of the files scanned by default
+IMAGE_EXTENSIONS = (
+    '.jpg', '.jpeg', '.tif', '.tiff', '.png', '.webp', '.heic',
+    # TIFF based raw formats
+    '.dng', '.nef', '.cr2', '.arw', '.orf', '.rw2', '.pef',
+)
+
+# modules imported on first use, loaded once by each worker beforehand
+WARM_MODULES = (
+    'exifread.heic', 'exifread.jpeg', 'exifread.xmp',
+    'exifread.tags.makernote.apple', 'exifread.tags.makernote.canon',
+    'exifread.tags.makernote.casio', 'exifread.tags.makernote.flir',
+    'exifread.tags.makernote.fujifilm', 'exifread.tags.makernote.nikon',
+    'exifread.tags.makernote.olympus',
+)
+
+# options of process_file(), set in each worker
+_options = {}  # type: dict
+
+
+def walk_entries(root: str, extensions=IMAGE_EXTENSIONS) -> Iterator['os.DirEntry']:
+    """Yield the ``os.DirEntry`` of the files under ``root`` with one of ``extensions``, None for all."""
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk_entries(entry.path, extensions)
+        elif entry.is_file() and (extensions is None or entry.name.lower().endswith(extensions)):
+            yield entry
+
+
+def walk(root: str, extensions=IMAGE_EXTENSIONS) -> Iterator[str]:
+    """Yield the paths of the files under ``root`` with one of ``extensions``, None for all."""
+    for entry in walk_entries(root, extensions):
+        yield entry.path
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _compact(tags) -> dict:
+    """Return the values of the tags in a plain dict, much lighter to send back than IfdTag objects."""
+    return {key: getattr(tag, 'values', tag) for key, tag in tags.items()}
+
+
+def _init_worker(options: dict) -> None:
+    _options.update(options)
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+
+def _scan_chunk(paths: List[str]) -> List[Tuple[str, object]]:
+    results = []  # type: List[Tuple[str, object]]
+    for path in paths:
+        try:
+            with open(path, 'rb') as fh:
+                results.append((path, _compact(_process_file(fh, **_options))))
+        except Exception as err:  # pylint: disable=broad-except
+            results.append((path, err))
+    return results
+
+
+def scan(root: str, processes=None, chunksize=64, extensions=IMAGE_EXTENSIONS,
+         **kwargs) -> Iterator[Tuple[str, object]]:
+    """
+    Process the image files of a directory tree on a pool of ``processes`` processes.
+
+    The tree is walked with ``os.scandir()``, the paths are sent to the
+    workers in chunks of ``chunksize`` and the results are yielded as the
+    chunks are done, as (path, tags) tuples. The tags are a plain dict of
+    the tag values, e.g. ``{'Image Orientation': 6, ...}``. When a file
+    cannot be processed, the exception is yielded in place of its tags.
+
+    Decoding makernotes and XMP is CPU-bound, processes scale where the
+    threads of ``process_files()`` do not. Options are the same as for
+    ``process_file()``.
+    """
+    with Pool(processes, initializer=_init_worker, initargs=(kwargs,)) as pool:
+        chunks = _chunks(walk(root, extensions), chunksize)
+        for results in pool.imap_unordered(_scan_chunk, chunks):
+            yield from results
@@ -0,0 +1,348 @@
+"""
+Compact binary catalog of the tags of many files, read in place from a memory map.
+
+Layout, little-endian:
+
+* header: magic, version, number of files, of strings and of records, and
+  the offsets of the sections below;
+* files: per file, the string IDs of its path, its first record and its
+  number of records, and whether its tags were a ``TagsView``;
+* records: per tag, the string IDs of its IFD and name and printable, the
+  ``IfdTag`` fields, and where its values are in the columns;
+* columns of the values: int16, int32 and int64 integers (a list of
+  integers in the narrowest column they fit), float64 floats, int64 ratio
+  numerators and denominators, uint32 string IDs;
+* strings: offsets then data, tag names, camera strings and all the other
+  strings and bytes, each stored once.
+"""
+
+import mmap
+import pickle
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .classes import IfdTag, TagsView
+from .utils import Ratio
+
+MAGIC = b'EXRS'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHHIII10Q')
+FILE = struct.Struct('<III?3x')
+RECORD = struct.Struct('<IIIIIIIHBBB3x')
+
+# kinds of values, stored in the column of their type (or the strings)
+KIND_NONE = 0
+KIND_INT = 1
+KIND_FLOAT = 2
+KIND_RATIO = 3
+KIND_STR = 4
+KIND_BYTES = 5
+KIND_PICKLE = 6
+KIND_INT16 = 7
+KIND_INT32 = 8
+
+# record flags
+FLAG_TAG = 1  # an IfdTag, else a plain value
+FLAG_SCALAR = 2  # a single value, else a list
+FLAG_PICKLED_PRINTABLE = 4  # printable not a string
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+# integer kinds by array code, narrowest first
+INT_KINDS = (('h', KIND_INT16, 1 << 15), ('i', KIND_INT32, 1 << 31), ('q', KIND_INT, 1 << 63))
+
+
+def _kind_of(value) -> int:
+    value_type = type(value)
+    if value_type is int:
+        return KIND_INT if INT64_MIN <= value <= INT64_MAX else KIND_PICKLE
+    if value_type is float:
+        return KIND_FLOAT
+    if value_type is Ratio:
+        return KIND_RATIO if (INT64_MIN <= value.numerator <= INT64_MAX
+                              and INT64_MIN <= value.denominator <= INT64_MAX) else KIND_PICKLE
+    if value_type is str:
+        return KIND_STR
+    if value_type is bytes:
+        return KIND_BYTES
+    if value is None:
+        return KIND_NONE
+    return KIND_PICKLE
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _packable(tag: IfdTag) -> bool:
+    """Whether the fields of a tag fit in a record, the others are stored pickled."""
+    return (_is_int(tag.tag) and 0 <= tag.tag <= 0xFFFF
+            and _is_int(tag.field_type) and 0 <= tag.field_type <= 0xFF
+            and all(_is_int(field) and 0 <= field <= 0xFFFFFFFF
+                    for field in (tag.field_offset, tag.field_length)))
+
+
+def _little_endian(column: array) -> bytes:
+    """Return the bytes of a column in little-endian order, whatever the byte order of the host."""
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+class SidecarWriter:
+    """
+    Write the tags of many files to a sidecar catalog at ``path``, one
+    ``add()`` per file, the catalog being written on ``close()``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._strings = {}  # type: dict
+        self._files = array('I')
+        self._records = bytearray()
+        self._record_count = 0
+        self._ints = {code: array(code) for code, _, _ in INT_KINDS}
+        self._floats = array('d')
+        self._ratios = array('q')
+        self._refs = array('I')
+
+    def _string(self, value) -> int:
+        """Return the ID of a string (or bytes), adding it to the table."""
+        key = (type(value), value)
+        string_id = self._strings.get(key)
+        if string_id is None:
+            string_id = self._strings[key] = len(self._strings)
+        return string_id
+
+    def _values(self, values) -> tuple:
+        """Store values in their column, return their (kind, start, count, scalar)."""
+        scalar = not isinstance(values, list)
+        items = [values] if scalar else values
+        kinds = {_kind_of(item) for item in items}
+        kind = kinds.pop() if len(kinds) == 1 else (KIND_INT if not kinds else KIND_PICKLE)
+        if not scalar and kind in (KIND_BYTES, KIND_NONE):
+            kind = KIND_PICKLE
+
+        if kind == KIND_NONE:
+            return kind, 0, 0, scalar
+        if kind == KIND_PICKLE:
+            return kind, self._string(pickle.dumps(values, pickle.HIGHEST_PROTOCOL)), 1, scalar
+        if kind == KIND_BYTES:
+            return kind, self._string(values), 1, scalar
+        if kind == KIND_INT:
+            low, high = (min(items), max(items)) if items else (0, 0)
+            for code, kind, limit in INT_KINDS:
+                if -limit <= low and high < limit:
+                    break
+            start = len(self._ints[code])
+            self._ints[code].extend(items)
+        elif kind == KIND_FLOAT:
+            start = len(self._floats)
+            self._floats.extend(items)
+        elif kind == KIND_RATIO:
+            start = len(self._ratios) // 2
+            for ratio in items:
+                self._ratios.append(ratio.numerator)
+                self._ratios.append(ratio.denominator)
+        else:
+            start = len(self._refs)
+            self._refs.extend(self._string(item) for item in items)
+        return kind, start, len(items), scalar
+
+    def add(self, path: str, tags) -> int:
+        """Add the tags of a file, as returned by ``process_file()``, return its number."""
+        if isinstance(tags, TagsView):
+            entries = tags.entries()
+        else:
+            entries = ((('', name), value) for name, value in tags.items())
+        first = self._record_count
+        for (ifd_name, name), tag in entries:
+            flags = 0
+            printable_id = tag_id = field_type = field_offset = field_length = 0
+            values = tag
+            if isinstance(tag, IfdTag) and _packable(tag):
+                flags |= FLAG_TAG
+                printable = tag.printable
+                if isinstance(printable, str):
+                    printable_id = self._string(printable)
+                else:
+                    flags |= FLAG_PICKLED_PRINTABLE
+                    printable_id = self._string(pickle.dumps(printable, pickle.HIGHEST_PROTOCOL))
+                tag_id, field_type = tag.tag, tag.field_type
+                field_offset, field_length = tag.field_offset, tag.field_length
+                values = tag.values
+            kind, start, count, scalar = self._values(values)
+            if scalar:
+                flags |= FLAG_SCALAR
+            self._records += RECORD.pack(self._string(ifd_name), self._string(name), printable_id,
+                                         field_offset, field_length, start, count, tag_id,
+                                         field_type, kind, flags)
+            self._record_count += 1
+        self._files.extend((self._string(path), first, self._record_count - first,
+                            isinstance(tags, TagsView)))
+        return len(self._files) // 4 - 1
+
+    def close(self) -> None:
+        strings = [value if isinstance(value, bytes) else value.encode('utf-8')
+                   for _, value in self._strings]
+        # string IDs are in insertion order, as dicts keep it
+        string_offsets = array('Q', [0])
+        for value in strings:
+            string_offsets.append(string_offsets[-1] + len(value))
+
+        files = b''.join(FILE.pack(*self._files[i:i + 4]) for i in range(0, len(self._files), 4))
+        sections = [files, bytes(self._records)]
+        sections += [_little_endian(self._ints[code]) for code, _, _ in INT_KINDS]
+        sections += [_little_endian(column) for column in (self._floats, self._ratios, self._refs, string_offsets)]
+        offsets = []
+        position = HEADER.size
+        for section in sections:
+            # 8-byte aligned, for the columns to be viewed in place
+            position += -position % 8
+            offsets.append(position)
+            position += len(section)
+        offsets.append(position)
+
+        with open(self.path, 'wb') as fh:
+            fh.write(HEADER.pack(MAGIC, VERSION, 0, len(self._files) // 4, len(strings),
+                                 self._record_count, *offsets))
+            for offset, section in zip(offsets, sections):
+                fh.write(b'\x00' * (offset - fh.tell()))
+                fh.write(section)
+            for value in strings:
+                fh.write(value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_sidecar(path: str, results: Iterable[Tuple[str, object]]) -> int:
+    """
+    Write the (path, tags) pairs of ``results``, as yielded by
+    ``process_files()``, to a sidecar catalog. Exceptions in place of tags
+    are left out. Returns the number of files written.
+    """
+    with SidecarWriter(path) as writer:
+        count = 0
+        for file_path, tags in results:
+            if not isinstance(tags, Exception):
+                writer.add(file_path, tags)
+                count += 1
+    return count
+
+
+class SidecarReader:
+    """
+    Read a sidecar catalog in place: the file is memory-mapped and only the
+    records of the files looked up are decoded.
+
+    ``reader[n]`` returns the tags of file ``n`` as ``process_file()`` did
+    (a ``TagsView`` of ``IfdTag`` or a dict), ``reader.path(n)`` its path
+    and ``reader.find(path)`` the tags of a file given its path.
+
+    The values which do not fit the columns are stored pickled, only open
+    catalogs you trust.
+    """
+
+    def __init__(self, path: str):
+        self.filename = path
+        with open(path, 'rb') as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self._file_count, self._string_count, self._record_count,
+         self._files_at, self._records_at, ints16_at, ints32_at, ints64_at, self._floats_at,
+         self._ratios_at, self._refs_at, self._string_offsets_at, self._strings_at) = HEADER.unpack_from(self._map)
+        # (array code, offset) of the integer columns by kind
+        self._ints_at = {KIND_INT16: ('h', ints16_at), KIND_INT32: ('i', ints32_at), KIND_INT: ('q', ints64_at)}
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError('%s is not a sidecar catalog of version %d' % (path, VERSION))
+        self._names = {}  # type: dict
+        self._paths = None  # type: Optional[Dict[str, int]]
+
+    def _bytes(self, string_id: int) -> bytes:
+        start, end = struct.unpack_from('<2Q', self._map, self._string_offsets_at + 8 * string_id)
+        return self._map[self._strings_at + start:self._strings_at + end]
+
+    def _str(self, string_id: int) -> str:
+        return self._bytes(string_id).decode('utf-8')
+
+    def _name(self, string_id: int) -> str:
+        """Same as ``_str()``, for the few strings (IFD and tag names) decoded over and over."""
+        name = self._names.get(string_id)
+        if name is None:
+            name = self._names[string_id] = self._str(string_id)
+        return name
+
+    def _values(self, kind: int, start: int, count: int, scalar: bool):
+        if kind == KIND_NONE:
+            return None
+        if kind == KIND_PICKLE:
+            return pickle.loads(self._bytes(start))
+        if kind == KIND_BYTES:
+            return self._bytes(start)
+        if kind in self._ints_at:
+            code, offset = self._ints_at[kind]
+            values = list(struct.unpack_from('<%d%s' % (count, code), self._map,
+                                             offset + struct.calcsize(code) * start))
+        elif kind == KIND_FLOAT:
+            values = list(struct.unpack_from('<%dd' % count, self._map, self._floats_at + 8 * start))
+        elif kind == KIND_RATIO:
+            terms = struct.unpack_from('<%dq' % (2 * count), self._map, self._ratios_at + 16 * start)
+            values = [Ratio(terms[i], terms[i + 1]) for i in range(0, len(terms), 2)]
+        else:
+            ids = struct.unpack_from('<%dI' % count, self._map, self._refs_at + 4 * start)
+            values = [self._str(string_id) for string_id in ids]
+        return values[0] if scalar else values
+
+    def __len__(self) -> int:
+        return self._file_count
+
+    def _file(self, number: int) -> tuple:
+        if not 0 <= number < self._file_count:
+            raise IndexError('file number out of range')
+        return FILE.unpack_from(self._map, self._files_at + FILE.size * number)
+
+    def path(self, number: int) -> str:
+        return self._str(self._file(number)[0])
+
+    def __getitem__(self, number: int):
+        _, first, count, view = self._file(number)
+        tags = {}  # type: Dict[Any, Any]
+        for record in range(first, first + count):
+            (ifd_id, name_id, printable_id, field_offset, field_length, start, value_count,
+             tag_id, field_type, kind, flags) = RECORD.unpack_from(self._map, self._records_at + RECORD.size * record)
+            value = self._values(kind, start, value_count, bool(flags & FLAG_SCALAR))
+            if flags & FLAG_TAG:
+                if flags & FLAG_PICKLED_PRINTABLE:
+                    printable = pickle.loads(self._bytes(printable_id))
+                else:
+                    printable = self._str(printable_id)
+                value = IfdTag(printable, tag_id, field_type, value, field_offset, field_length)
+            if view:
+                tags[(self._name(ifd_id), self._name(name_id))] = value
+            else:
+                tags[self._name(name_id)] = value
+        return TagsView(tags) if view else tags
+
+    def find(self, path: str):
+        """Return the tags of a file given its path, the paths are all read on first use."""
+        if self._paths is None:
+            self._paths = {self.path(number): number for number in range(self._file_count)}
+        return self[self._paths[path]]
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -3,9 +3,8 @@
 """
 
 from .exif import EXIF_TAGS
-from .makernote import (
-    apple, canon, casio, fujifilm, nikon, olympus,
-)
+# the makernote tables are imported on first use
+from . import makernote
 
 DEFAULT_STOP_TAG = 'UNDEF'
 
@@ -1,3 +1,21 @@
 """
 Makernote tag definitions.
+
+The tables are big, each module is only imported when first used with
+``load()``, e.g. ``makernote.load('canon')``.
 """
+
+import importlib
+
+__all__ = ['apple', 'canon', 'casio', 'fujifilm', 'flir', 'nikon', 'olympus']
+
+
+def load(name: str):
+    """Return the module of the tags of a maker, importing it on first use."""
+    return importlib.import_module('.' + name, __name__)
+
+
+def __getattr__(name):
+    if name in __all__:
+        return load(name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
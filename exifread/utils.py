@@ -79,6 +79,21 @@ def get_gps_coords(tags: dict) -> tuple:
     return (lat_coord, lng_coord)
 
 
+def file_reader(fh):
+    """Return a ``read_at(offset, size)`` function reading from a file object."""
+    def read_at(offset, size):
+        fh.seek(offset)
+        return fh.read(size)
+    return read_at
+
+
+def buffer_reader(data):
+    """Return a ``read_at(offset, size)`` function slicing a buffer, without copy."""
+    def read_at(offset, size):
+        return data[offset:offset + size]
+    return read_at
+
+
 def dms_to_dd(dms):
     """
     Converts coordinate value from degrees, minutes, seconds to decimal degrees.
@@ -1,260 +1,144 @@
-import rdflib
+"""
+Parse XMP packets into a dictionary of tags.
 
-# from rdflib import Graph
+The RDF/XML is read with ElementTree (expat), the rdflib backend in
+``xmp_rdflib`` is only used as a fallback, when installed, for the RDF
+syntax not mapped here.
+"""
 
+from typing import List
+from xml.etree import ElementTree
 
-class XMP:
+from .exif_log import get_logger
+from .xmp_base import XMPBase
 
-    def __init__(self, xmp_bytes : bytes):
+logger = get_logger()
 
-        self.bytes = xmp_bytes
-        self.str = xmp_bytes.decode("utf-8")
-        # Get RDF XML
-        # NOTE: This seems to work for  a few different test files, but there may
-        # very well be images out there with XMP metatdata not in RDF format.
-        # self.rdf_str = ''.join(self.str.splitlines()[1:-1]).strip()
-        self.rdf_str = self.str
+RDF_NS = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}'
+XML_NS = '{http://www.w3.org/XML/1998/namespace}'
 
-        self.graph = self._create_rdfgraph()
+# rdf: attributes which are part of the syntax, not properties
+RDF_SYNTAX_ATTRIBUTES = {
+    RDF_NS + name for name in (
+        'about', 'ID', 'nodeID', 'resource', 'parseType', 'datatype',
+        'bagID', 'aboutEach', 'aboutEachPrefix',
+    )
+}
 
-        self.root = self.get_root()
+# kinds of property values
+LITERAL = 0
+RESOURCE = 1
+NODE = 2
 
-        self.tags = self.get_nodes_as_dict(self.graph, self.root)
 
-    def _create_rdfgraph(self):
-        return rdflib.graph.Graph().parse(data=self.rdf_str, format='xml')
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
 
-    def get_root(self):
-        """
-        Get the root of a graph. Note that this is based on MicaSense RDF graphs, 
-        and probably isn't the best way to do this.
-
-        Returns the regular (non-blank) subjects of a graph.
 
-        Parameters
-        ----------
-        graph : rdflib.graph.Graph
+class XMP(XMPBase):
 
-        Returns
-        -------
-        node
-            Root node(s) of the graph.
-        """
-        nodes = self._get_unique_nodes()
-
-        for node in nodes:
-            if isinstance(node,rdflib.term.URIRef):
-                return node
-
-    def _get_unique_nodes(self):
-        """
-        Get the unique nodes of from the subjects of a graph.
-
-        Parameters
-        ----------
-        graph : rdflib.graph.Graph
+    def __init__(self, xmp_bytes : bytes):
 
-        Returns
-        -------
-        subs : set
-        """
+        self.bytes = xmp_bytes
+        self.str = xmp_bytes.decode("utf-8")
+        # NOTE: This seems to work for  a few different test files, but there may
+        # very well be images out there with XMP metatdata not in RDF format.
+        self.rdf_str = self.str
 
-        subs = set([s for s in self.graph.subjects()])
+        # properties using RDF syntax not mapped by this parser
+        self.unsupported = []  # type: List[str]
+        self.tags = self.parse()
 
-        return subs
+        if self.unsupported:
+            try:
+                from .xmp_rdflib import RDFLibXMP  # pylint: disable=import-outside-toplevel
+            except ImportError:
+                logger.warning('XMP: skipped %s, install rdflib to read them', ', '.join(self.unsupported))
+            else:
+                self.tags = RDFLibXMP(xmp_bytes).tags
 
-    def get_nodes_as_dict(self, graph: rdflib.graph.Graph, root: rdflib.term.URIRef):
+    def parse(self) -> dict:
         """
-        Get the nodes for the root of an RDF graph and return as a dictionary.
+        Get the properties of the root of the RDF as a dictionary.
 
-        Parameters
-        ----------
-        graph : rdflib.graph.Graph
-            RDF graph 
-        root : rdflib.term.URIRef
-            The root of the RDF graph for which to retrieve the nodes.
+        The keys are the property names without their prefix, literals are
+        formatted with ``format_object()``, and the members of containers
+        (``rdf:Seq``, ``rdf:Bag``, ``rdf:Alt``) or structures become lists.
 
         Returns
         -------
         nodes : dict
-            Contains the predicates of the root as keys and their objects as values.
         """
-        nodes = {}
-        # Iterate through nodes in the root
-        for pred,obj in graph[root]:
-            # Get the prefix of the predicate (prettier than the URL)
-            key = self._get_rdf_prefix(graph, pred)[1]
-            # Object
-            if isinstance(obj, rdflib.term.BNode):
-                # If the object is a reference to a blank node, go get that node's 
-                # objects
-                val = self._get_bnode_objects(graph, obj)
-            # Otherwise, the object should be am rdf.term.Literal, which can be formatted.        
-            # elif isinstance(obj, rdflib.term.Literal):
-            else:
-                val = self.format_object(obj)
-            # Add node to dictionary
-            nodes[key] = val
+        rdf = ElementTree.fromstring(self.rdf_str)
+        if rdf.tag != RDF_NS + 'RDF':
+            found = rdf.find('.//' + RDF_NS + 'RDF')
+            if found is None:
+                return {}
+            rdf = found
 
+        nodes = {}
+        root = None
+        for node in rdf:
+            about = node.get(RDF_NS + 'about')
+            # the root is the first node with an URI, its description may be split
+            if about is None or (root is not None and about != root):
+                continue
+            root = about
+            for key, (kind, val) in self._get_properties(node):
+                if kind == NODE:
+                    nodes[key] = val
+                else:
+                    nodes[key] = self.format_object(val)
         return nodes
 
-    def _get_rdf_prefix(self, graph : rdflib.graph.Graph, uri: rdflib.term.URIRef):
-        """
-        Returns the RDF prefix for a given URI reference. 
-
-        Basically, this returns the formatted value of the URI reference, which is an
-        ugly URL.
-
-        Parameters
-        ----------
-        graph : rdflib.graph.Graph
-            RDF Graph containing the URI reference.
-        uri : rdflib.term.URIRef
-            URI reference.
-
-        Returns
-        -------
-        Tuple of tags corresponding to the RDF prefix. The first value is the namespace
-        and the second is the tag (sub-category of the namespace). For now, we only 
-        want the tags, but this allows for retrieval of the namespace for future implementation.
-        """
-        # Query the graph for the prefix + separate root from tag
-        tags = graph.qname(uri).split(':')
-
-        return tags[0],tags[1]
-
-
-
-    @staticmethod
-    def extract_literal(val):
-        """
-        Attempts to convert a variable to a float. If this fails, returns a string.
-
-        Parameters
-        ----------
-        val : any, intended for use with rdflib.term.Literal
-            Variable to be converted
-
-        Returns
-        -------
-        float or str
-            Input value as float or str.
-        """
-        try: 
-            return float(val)
-        except:
-            return str(val)
-
-    # @staticmethod
-    # def format_object(obj):
-    #     """
-    #     Format the object of a graph. If the object is a single value, it will be
-    #     converted to a float or str. If it has multiple values, it will become a 
-    #     list of values.
-
-    #     Parameters
-    #     ----------
-    #     obj : rdflib.term.Literal
-    #         Object of an RDF graph.
-
-    #     Returns
-    #     -------
-    #     new_obj : str, float, list
-    #         Returns str or float if single value, otherwise a list of str and/or floats.
-    #     """
-        
-    #     new_obj = XMP.extract_literal(obj)
-    #     # Check if list
-    #     if isinstance(new_obj,str) and ',' in new_obj:
-    #         new_obj = [XMP.extract_literal(o) for o in new_obj.split(',')]
-
-    #     return new_obj
-
-    @staticmethod
-    def format_object(obj):
-        """
-        Format the object of a graph. If the object is a single value, it will be
-        converted to a float or str. If it has multiple values, it will become a 
-        list of values.
-
-        Parameters
-        ----------
-        obj : rdflib.term.Literal
-            Object of an RDF graph.
-
-        Returns
-        -------
-        new_obj : str, float, list
-            Returns str or float if single value, otherwise a list of str and/or floats.
-        """
-        if isinstance(obj,list):
-            new_obj = [XMP.extract_literal(o) for o in obj]
-        else:
-            new_obj = XMP.extract_literal(obj)
-            # Check if list
-            if isinstance(new_obj,str) and ',' in new_obj:
-                new_obj = [XMP.extract_literal(o) for o in new_obj.split(',')]
-
-        return new_obj
-
-    def _get_bnode_objects(self, graph: rdflib.graph.Graph, bnode : rdflib.term.BNode):
-        """
-        Retrieve the objects from a blank node.
-
-        Parameters
-        ----------
-        graph : rdflib.graph.Graph
-            
-        bnode : rdflib.term.BNode
-            Blank node from which to retrieve the objects
-
-        Returns
-        -------
-        blank_objects : list
-            Contains the formatted objects of a blank node as a list.
-        """
-        blank_objects = [self.extract_literal(o) for o in graph.objects(bnode) if type(o) != rdflib.term.URIRef]
-
-        return blank_objects
-
-    def _get_blank_subjects(self, graph: rdflib.graph.Graph):
-        """
-        Get blank nodes that are subjects of a graph. Blank nodes have no URI or literal.
-
-        Parameters
-        ----------
-        graph : rdflib.graph.Graph
-
-        Returns
-        -------
-        list
-            List of rdflib.term.BNode objects that are subjects in the graph.
-        """
-
-        return [s for s in graph.subjects() if isinstance(s,rdflib.term.BNode)]
-
-
-    def _get_bnodes_as_dict(self, graph: rdflib.graph.Graph):
-        """
-        Get blank nodes of a graph as a dictionary. Blank nodes have no URI or literal.
-
-        For MicaSense metadata, these represent structured objects corresponding to 
-        predicates in the root graph.
-
-        Parameters
-        ----------
-        graph : rdflib.graph.Graph
-
-        Returns
-        -------
-        bnodes : dict
-            Dictionary containing blank subjects from root graph (as keys) and blank
-            objects from root graph (as values). Predicates are omitted for now, as 
-            they are just numbers corresponding to each object.
-        """
-        # Get blank subjects
-        blank_subjects = self._get_blank_subjects(graph)
-        # Initialize empty dictionary for blank nodes
-        bnodes = dict([self._get_bnode_objects(graph, bnode) for bnode in blank_subjects])
-
-        return bnodes
+    def _get_properties(self, node: ElementTree.Element):
+        """Yield the (name, (kind, value)) properties of a node element."""
+        if node.tag != RDF_NS + 'Description':
+            # typed node
+            yield 'type', (RESOURCE, node.tag.replace('}', '', 1).lstrip('{'))
+        for name, val in node.attrib.items():
+            if name in RDF_SYNTAX_ATTRIBUTES or name.startswith(XML_NS) or not name.startswith('{'):
+                continue
+            yield _local_name(name), (LITERAL, val)
+        for prop in node:
+            value = self._get_value(prop)
+            if value is not None:
+                yield _local_name(prop.tag), value
+
+    def _get_value(self, prop: ElementTree.Element):
+        """Return the (kind, value) of a property element, None when not mapped."""
+        parse_type = prop.get(RDF_NS + 'parseType')
+        if parse_type == 'Resource':
+            return NODE, self._get_node_objects(prop)
+        if parse_type is not None or prop.get(RDF_NS + 'nodeID') is not None:
+            # Literal and Collection parse types, node references
+            self.unsupported.append(_local_name(prop.tag))
+            return None
+        resource = prop.get(RDF_NS + 'resource')
+        if resource is not None:
+            return RESOURCE, resource
+        if len(prop):
+            node = prop[0]
+            about = node.get(RDF_NS + 'about')
+            if about is not None:
+                return RESOURCE, about
+            return NODE, self._get_node_objects(node)
+        if any(name.startswith('{') and name not in RDF_SYNTAX_ATTRIBUTES and not name.startswith(XML_NS)
+               for name in prop.attrib):
+            # property attributes on an empty property element describe a blank node
+            return NODE, self._get_node_objects(prop)
+        return LITERAL, prop.text or ''
+
+    def _get_node_objects(self, node: ElementTree.Element) -> list:
+        """
+        Retrieve the objects of a blank node, the members of a container.
+
+        Resources are left out, nested blank nodes become lists.
+        """
+        objects = []
+        for _, (kind, val) in self._get_properties(node):
+            if kind == LITERAL:
+                objects.append(self.extract_literal(val))
+            elif kind == NODE:
+                objects.append(val)
+        return objects
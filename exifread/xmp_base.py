@@ -0,0 +1,79 @@
+"""
+Formatting of the literals of XMP properties, shared by the XMP parsers.
+"""
+
+
+class XMPBase:
+    """Tags of an XMP packet, set by the parsers in ``tags``."""
+
+    @staticmethod
+    def extract_literal(val):
+        """
+        Attempts to convert a variable to a float. If this fails, returns a string.
+
+        Parameters
+        ----------
+        val : any, intended for use with literals (str or rdflib.term.Literal)
+            Variable to be converted
+
+        Returns
+        -------
+        float or str
+            Input value as float or str.
+        """
+        try:
+            return float(val)
+        except:
+            return str(val)
+
+    # @staticmethod
+    # def format_object(obj):
+    #     """
+    #     Format the object of a graph. If the object is a single value, it will be
+    #     converted to a float or str. If it has multiple values, it will become a
+    #     list of values.
+
+    #     Parameters
+    #     ----------
+    #     obj : rdflib.term.Literal
+    #         Object of an RDF graph.
+
+    #     Returns
+    #     -------
+    #     new_obj : str, float, list
+    #         Returns str or float if single value, otherwise a list of str and/or floats.
+    #     """
+
+    #     new_obj = XMPBase.extract_literal(obj)
+    #     # Check if list
+    #     if isinstance(new_obj,str) and ',' in new_obj:
+    #         new_obj = [XMPBase.extract_literal(o) for o in new_obj.split(',')]
+
+    #     return new_obj
+
+    @staticmethod
+    def format_object(obj):
+        """
+        Format the object of a property. If the object is a single value, it will be
+        converted to a float or str. If it has multiple values, it will become a
+        list of values.
+
+        Parameters
+        ----------
+        obj : str or rdflib.term.Literal
+            Object of an RDF property.
+
+        Returns
+        -------
+        new_obj : str, float, list
+            Returns str or float if single value, otherwise a list of str and/or floats.
+        """
+        if isinstance(obj,list):
+            new_obj = [XMPBase.extract_literal(o) for o in obj]
+        else:
+            new_obj = XMPBase.extract_literal(obj)
+            # Check if list
+            if isinstance(new_obj,str) and ',' in new_obj:
+                new_obj = [XMPBase.extract_literal(o) for o in new_obj.split(',')]
+
+        return new_obj
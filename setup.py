@@ -35,5 +35,9 @@
     ],
     extras_require={
         "dev": dev_requirements,
+        # fallback XMP backend, for RDF syntax the default parser does not map
+        "rdflib": ["rdflib"],
+        # vectorized decoding of large IFDs
+        "numpy": ["numpy"],
     },
 )